@@ -0,0 +1,157 @@
+"""Tokens and wall time per question: one request per difficulty vs. one batch.
+
+The per-difficulty path sends the lesson notes four times (one prompt per
+difficulty); the batch path sends them once and asks for every difficulty.
+
+    python -m benchmarks.bench_batch                        # fake LLM, synthetic notes
+    python -m benchmarks.bench_batch --doc doc_export.txt --latency 1.5 --output-rate 300
+    GOOGLE_API_KEY=... python -m benchmarks.bench_batch --doc doc_export.txt --live
+
+With the fake LLM, token counts are estimates (see fakes.estimate_tokens)
+and time is ``latency`` per call plus response length / ``output-rate``.
+``--live`` calls Gemini and reads the counts from ``usage_metadata``.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.bench_pipeline import make_corpus
+from benchmarks.fakes import FakeLLM, install_fake_genai
+from lessons import parse_doc
+from quiz_logic import build_quiz_context
+from quiz_prompts import (
+    DIFFICULTIES, build_batch_quiz_instruction, build_batch_quiz_request, build_quiz_instruction,
+    build_quiz_request, pack_lesson_notes, parse_quiz_json, split_quiz_batch,
+)
+
+DEFAULT_MODEL = 'gemini-2.5-flash-lite'
+
+
+def call(model, prompt):
+    """(response text, prompt tokens, output tokens, seconds)"""
+    start = time.perf_counter()
+    response = model.generate_content(prompt)
+    elapsed = time.perf_counter() - start
+    usage = response.usage_metadata
+    return response.text, usage.prompt_token_count, usage.candidates_token_count, elapsed
+
+
+def run_single(model, content, count):
+    notes = pack_lesson_notes(content)
+    result = {'calls': 0, 'prompt_tokens': 0, 'output_tokens': 0, 'seconds': 0.0, 'questions': {}}
+    for difficulty in DIFFICULTIES:
+        prompt = f"{build_quiz_instruction(difficulty)}\n\n{notes}\n\n{build_quiz_request(count)}"
+        text, prompt_tokens, output_tokens, seconds = call(model, prompt)
+        result['calls'] += 1
+        result['prompt_tokens'] += prompt_tokens
+        result['output_tokens'] += output_tokens
+        result['seconds'] += seconds
+        result['questions'][difficulty] = len(parse_quiz_json(text))
+        result.setdefault('first_seconds', seconds)
+    # Switching to another difficulty costs a whole request.
+    result['switch_seconds'] = result['seconds'] / len(DIFFICULTIES)
+    return result
+
+
+def run_batch(model, content, count):
+    notes = pack_lesson_notes(content)
+    prompt = (f"{build_batch_quiz_instruction(DIFFICULTIES)}\n\n{notes}\n\n"
+              f"{build_batch_quiz_request(count, DIFFICULTIES)}")
+    text, prompt_tokens, output_tokens, seconds = call(model, prompt)
+    batch = split_quiz_batch(parse_quiz_json(text), DIFFICULTIES)
+    return {
+        'calls': 1,
+        'prompt_tokens': prompt_tokens,
+        'output_tokens': output_tokens,
+        'seconds': seconds,
+        # The first quiz waits for every difficulty to be decoded.
+        'first_seconds': seconds,
+        'questions': {d: len(batch.get(d, [])) for d in DIFFICULTIES},
+        # The other difficulties are already banked.
+        'switch_seconds': 0.0,
+    }
+
+
+def per_question(result):
+    questions = sum(result['questions'].values()) or 1
+    result['per_question'] = {
+        'prompt_tokens': round(result['prompt_tokens'] / questions, 1),
+        'output_tokens': round(result['output_tokens'] / questions, 1),
+        'total_tokens': round((result['prompt_tokens'] + result['output_tokens']) / questions, 1),
+        'ms': round(result['seconds'] * 1000 / questions, 1),
+    }
+    result['seconds'] = round(result['seconds'], 3)
+    result['first_seconds'] = round(result['first_seconds'], 3)
+    result['switch_seconds'] = round(result['switch_seconds'], 3)
+    return result
+
+
+def load_content(path):
+    if path:
+        text = Path(path).read_text(encoding='utf-8')
+        lessons = parse_doc(text, doc_id=Path(path).stem, name=Path(path).stem)
+    else:
+        (name, doc_id), text = next(iter(make_corpus(1).items()))
+        lessons = parse_doc(text, doc_id=doc_id, name=name)
+    return build_quiz_context(lessons)
+
+
+def print_report(report):
+    print(f"notes: {report['content_chars']} chars, {report['count']} questions per difficulty")
+    print(f"  {'path':<10}{'calls':>6}{'in tok':>9}{'out tok':>9}{'wall s':>8}"
+          f"{'tok/q':>8}{'ms/q':>8}{'first s':>9}{'switch s':>10}")
+    for path in ('single', 'batch'):
+        r = report[path]
+        q = r['per_question']
+        print(f"  {path:<10}{r['calls']:>6}{r['prompt_tokens']:>9}{r['output_tokens']:>9}{r['seconds']:>8}"
+              f"{q['total_tokens']:>8}{q['ms']:>8}{r['first_seconds']:>9}{r['switch_seconds']:>10}")
+    single, batch = report['single']['per_question'], report['batch']['per_question']
+    if single['total_tokens'] and single['ms']:
+        print(f"  batch/single per question: tokens {batch['total_tokens'] / single['total_tokens']:.2f}x, "
+              f"time {batch['ms'] / single['ms']:.2f}x")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--doc', help='export text to quiz on (default: a synthetic notebook)')
+    parser.add_argument('--count', type=int, default=15, help='questions per difficulty')
+    parser.add_argument('--latency', type=float, default=1.0, help='fake LLM seconds per call')
+    parser.add_argument('--output-rate', type=float, default=400.0, help='fake LLM output chars per second')
+    parser.add_argument('--live', action='store_true', help='call Gemini (needs GOOGLE_API_KEY)')
+    parser.add_argument('--model', default=DEFAULT_MODEL)
+    parser.add_argument('--output', help='write the report as JSON')
+    args = parser.parse_args(argv)
+
+    restore = None
+    if not args.live:
+        restore = install_fake_genai(FakeLLM(latency=args.latency, output_chars_per_second=args.output_rate))
+    try:
+        import google.generativeai as genai
+        if args.live:
+            genai.configure(api_key=os.environ['GOOGLE_API_KEY'])
+        model = genai.GenerativeModel(args.model)
+
+        content = load_content(args.doc)
+        report = {
+            'live': args.live,
+            'model': args.model,
+            'content_chars': len(content),
+            'count': args.count,
+            'single': per_question(run_single(model, content, args.count)),
+            'batch': per_question(run_batch(model, content, args.count)),
+        }
+    finally:
+        if restore is not None:
+            restore()
+
+    print_report(report)
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
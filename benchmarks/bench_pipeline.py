@@ -0,0 +1,268 @@
+"""Micro-benchmarks for parsing, context building and progress bookkeeping.
+
+Synthetic notebooks modeled on doc_export.txt (``@ MM-DD`` markers, mixed
+Korean/Japanese lines with readings, blank-line spacing) are generated at
+each scale: 1x is one year of monthly notebooks, 10x/100x add more years.
+
+    python -m benchmarks.bench_pipeline                    # all scales
+    python -m benchmarks.bench_pipeline --scales 1,10 --compare benchmarks/results/abc1234.json
+
+Results (time per call and tracemalloc peak) are written to
+``benchmarks/results/<git sha>.json`` unless ``--output`` says otherwise.
+With ``--compare`` the run exits non-zero when a case gets slower than
+``--tolerance`` allows, or its peak memory grows by more than
+``--memory-tolerance``.
+"""
+import argparse
+import datetime
+import json
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from lessons import LessonIndex, parse_doc
+from local_corpus import ExportBuffer
+from quiz_logic import (
+    build_exam_context, build_quiz_context, filter_unmastered, record_answer,
+    serialize_progress,
+)
+from retrieval import PassageIndex
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+LESSONS_PER_NOTEBOOK = 8
+LINES_PER_LESSON = (15, 35)
+# Progress size at 1x; grows with the scale like a long-time user's history.
+MASTERY_ENTRIES = 300
+WRONG_NOTES = 60
+
+KOREAN_WORDS = ['저는', '한국인', '입니다', '선생님도', '얼마에요', '이것은', '무엇입니까', '좋아하세요',
+                '수고하세요', '어디에서요', '일본어', '학교', '회사', '어제', '오늘', '내일', '먹었어요',
+                '마셨어요', '갔습니다', '왔습니다']
+JAPANESE_PHRASES = ['先生も韓国人ですか。', 'これは何ですか。', 'いくらですか。', '学校に行きます。',
+                    '昨日は忙しかったです。', 'お疲れ様です。', 'どこですか。', '好きですか。',
+                    '仕事が終わって家に帰りました。', '日本語を勉強しています。']
+READINGS = ['센세-모 캉코쿠진 데스까?', '고레 와 난 데스까?', '이쿠라 데스까?', '각코- 니 이키마스.',
+            '오츠카레 사마 데스.', '도코 데스까?', '스키데스까?', '니홍고 오 벤꾜- 시테 이마스.']
+
+
+def make_line(rng):
+    kind = rng.random()
+    korean = ' '.join(rng.choice(KOREAN_WORDS) for _ in range(rng.randint(2, 5)))
+    if kind < 0.4:
+        return f"{korean}? {rng.choice(JAPANESE_PHRASES)}{rng.choice(READINGS)} "
+    if kind < 0.7:
+        return f"{korean}, {rng.choice(READINGS)} "
+    if kind < 0.85:
+        return f"{rng.randint(1, 9)}. ~{rng.choice(KOREAN_WORDS)}, ~{rng.choice(READINGS)} "
+    return f"# {rng.choice(JAPANESE_PHRASES)} / {korean}"
+
+
+def make_notebook(year, month, rng):
+    lines = []
+    days = sorted(rng.sample(range(1, 29), LESSONS_PER_NOTEBOOK))
+    for day in days:
+        lines.append(f"@ {month:02d}-{day:02d}")
+        for _ in range(rng.randint(*LINES_PER_LESSON)):
+            lines.append(make_line(rng))
+            if rng.random() < 0.5:
+                lines.extend(['', ''])
+    return '\ufeff' + '\n'.join(lines) + '\n'
+
+
+def make_corpus(scale, seed=0):
+    """``{(name, doc_id): text}`` for ``12 * scale`` monthly notebooks."""
+    rng = random.Random(seed)
+    corpus = {}
+    for i in range(12 * scale):
+        year, month = 2025 + i // 12, i % 12 + 1
+        corpus[(f"{year}년 {month}월", f"doc-{year}-{month:02d}")] = make_notebook(year, month, rng)
+    return corpus
+
+
+def make_history(scale, seed=0):
+    rng = random.Random(seed)
+    mastery = {f"[{i}] 다음 중 올바른 표현은? {rng.choice(JAPANESE_PHRASES)}": rng.randint(0, 4)
+               for i in range(MASTERY_ENTRIES * scale)}
+    wrong_notes = [{
+        'question': f"[w{i}] 다음 문장의 괄호에 들어갈 말은? 「{rng.choice(JAPANESE_PHRASES)}」",
+        'options': rng.sample(['食べる', '飲む', '行く', '来る', '寝る', '終わって', '帰りました'], 5),
+        'answer_index': rng.randint(0, 4),
+        'explanation': f"'{rng.choice(JAPANESE_PHRASES)}'({rng.choice(READINGS)})가 정답입니다.",
+        'type': '문법',
+    } for i in range(WRONG_NOTES * scale)]
+    return {'mastery': mastery, 'wrong_notes': wrong_notes, 'vocab_list': []}
+
+
+def make_questions(history, count=15):
+    # Half already in the mastery table, half new, like a repeat round.
+    known = list(history['mastery'])[:count // 2]
+    return [{'question': q, 'options': ['a', 'b', 'c', 'd', 'e'], 'answer_index': 0} for q in known] + [
+        {'question': f"new {i}", 'options': ['a', 'b', 'c', 'd', 'e'], 'answer_index': 0}
+        for i in range(count - len(known))
+    ]
+
+
+def build_index(corpus):
+    index = LessonIndex()
+    for (name, doc_id), text in corpus.items():
+        index.update_document(doc_id, ExportBuffer(text, name=doc_id), name=name)
+    return index
+
+
+def measure(fn, setup=None, min_time=0.2, max_calls=1000):
+    """Median seconds per call over calls totalling ``min_time``, and the
+    tracemalloc peak of one call. ``setup()`` builds fresh arguments per call
+    and is not timed.
+    """
+    setup = setup or (lambda: ())
+    times = []
+    total = 0.0
+    while (total < min_time or len(times) < 3) and len(times) < max_calls:
+        args = setup()
+        start = time.perf_counter()
+        fn(*args)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed)
+        total += elapsed
+
+    args = setup()
+    tracemalloc.start()
+    fn(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    times.sort()
+    return {
+        'calls': len(times),
+        'median_ms': round(times[len(times) // 2] * 1000, 4),
+        'min_ms': round(times[0] * 1000, 4),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run_scale(scale, seed):
+    corpus = make_corpus(scale, seed)
+    history = make_history(scale, seed)
+    texts = list(corpus.items())
+    first_id = texts[0][0][1]
+    results = {'corpus_bytes': sum(len(t.encode('utf-8')) for _, t in texts)}
+
+    def parse_all(with_content):
+        for (name, doc_id), text in texts:
+            lessons = parse_doc(text, doc_id=doc_id, name=name)
+            if with_content:
+                for lesson in lessons:
+                    lesson.content
+
+    results['parse_doc'] = measure(lambda: parse_all(False))
+    results['parse_doc+content'] = measure(lambda: parse_all(True))
+    # Same parse, plus sorting every lesson into one shared LessonIndex.
+    results['index_docs'] = measure(lambda: build_index(corpus))
+
+    index = build_index(corpus)
+    for lesson in index.lessons():
+        lesson.content
+    results['quiz_context'] = measure(lambda: build_quiz_context(index.lessons(first_id)))
+    results['range_query_4w'] = measure(lambda: index.period('last 4 weeks'))
+
+    doc_ids = [doc_id for _, doc_id in corpus]
+    rng = random.Random(seed)
+    results['exam_context_cold'] = measure(
+        lambda idx, pidx: build_exam_context(idx, pidx, doc_ids, history, rng),
+        setup=lambda: (build_index(corpus), PassageIndex()),
+        min_time=0, max_calls=3,
+    )
+    passages = PassageIndex()
+    build_exam_context(index, passages, doc_ids, history, rng)
+    results['exam_context_warm'] = measure(lambda: build_exam_context(index, passages, doc_ids, history, rng))
+    empty = {'mastery': {}, 'wrong_notes': [], 'vocab_list': []}
+    results['exam_context_random'] = measure(lambda: build_exam_context(index, passages, doc_ids, empty, rng))
+
+    questions = make_questions(history)
+    results['start_quiz_filter'] = measure(lambda: filter_unmastered(questions, history['mastery']))
+
+    # Worst case for the dedupe scan: the note is already present, at the end.
+    last_note = history['wrong_notes'][-1]
+    results['submit_answer_dedupe'] = measure(lambda: record_answer(history, last_note, False, 'quiz'))
+
+    results['progress_serialize'] = measure(lambda: serialize_progress(history))
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def ratio(new, old):
+    return new / old if old else 1.0
+
+
+def compare(report, baseline, tolerance, memory_tolerance):
+    regressions = []
+    for scale, cases in report['scales'].items():
+        for case, stats in cases.items():
+            base = baseline.get('scales', {}).get(scale, {}).get(case)
+            if not isinstance(stats, dict) or not base:
+                continue
+            time_ratio = ratio(stats['median_ms'], base['median_ms'])
+            peak_ratio = ratio(stats['peak_kb'], base.get('peak_kb', 0))
+            slower = time_ratio > 1 + tolerance
+            bigger = peak_ratio > 1 + memory_tolerance
+            marker = ' REGRESSION' if slower or bigger else ''
+            print(f"{scale:>5}x {case:<22} {base['median_ms']:>10} -> {stats['median_ms']:>10} ms "
+                  f"({time_ratio:.2f}x{'!' if slower else ''}), "
+                  f"{base.get('peak_kb', '-'):>10} -> {stats['peak_kb']:>10} KiB "
+                  f"({peak_ratio:.2f}x{'!' if bigger else ''}){marker}")
+            if marker:
+                regressions.append((scale, case))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', default='1,10,100')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='JSON results path (default: benchmarks/results/<sha>.json)')
+    parser.add_argument('--compare', help='previous results JSON to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed median time increase')
+    parser.add_argument('--memory-tolerance', type=float, default=0.25, help='allowed peak memory increase')
+    args = parser.parse_args(argv)
+
+    report = {
+        'revision': git_revision(),
+        'date': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'scales': {},
+    }
+    for scale in (int(s) for s in args.scales.split(',')):
+        results = run_scale(scale, args.seed)
+        report['scales'][str(scale)] = results
+        print(f"\n{scale}x ({results['corpus_bytes'] / 1024:.0f} KiB of notes)")
+        print(f"  {'case':<22}{'median ms':>12}{'peak KiB':>12}")
+        for case, stats in results.items():
+            if isinstance(stats, dict):
+                print(f"  {case:<22}{stats['median_ms']:>12}{stats['peak_kb']:>12}")
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['revision']}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+        print(f"\nCompared with {baseline.get('revision', args.compare)}:")
+        if compare(report, baseline, args.tolerance, args.memory_tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""Local stand-ins for Google Docs and Gemini used by the benchmarks."""
+import json
+import random
+import re
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeDocsServer:
+    """Serves ``/document/d/<doc_id>/export`` like the Google Docs text export.
+
+    ``docs`` maps doc id -> text; ``default`` is served for unknown ids so the
+    app's hard-coded DOCS table works unchanged.
+    """
+
+    def __init__(self, docs=None, default=None, latency=0.0):
+        self.docs = docs or {}
+        self.default = default
+        self.latency = latency
+        self.requests = 0
+        self._server = None
+        self._thread = None
+
+    @property
+    def url_template(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/document/d/{{doc_id}}/export?format=txt"
+
+    def start(self):
+        owner = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                owner.requests += 1
+                match = re.match(r'^/document/d/([^/]+)/export', self.path)
+                text = None
+                if match:
+                    text = owner.docs.get(match.group(1), owner.default)
+                if owner.latency:
+                    time.sleep(owner.latency)
+                if text is None:
+                    self.send_error(404)
+                    return
+                body = text.encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+OPTIONS = ("食べる", "飲む", "行く", "来る", "寝る")
+CORRECT_OPTION = OPTIONS[0]
+
+
+def estimate_tokens(text):
+    """Rough Gemini token count: ~4 ASCII characters per token, one per other character."""
+    ascii_chars = sum(1 for c in text if c < '\x80')
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+class FakeLLM:
+    """Plays Gemini: sleeps ``latency`` seconds and fails at ``error_rate``.
+
+    Quiz prompts get ``N`` well-formed questions (N parsed from "N문제"), or
+    an object of N per difficulty for batch prompts; vocabulary prompts get a
+    word list. Every prompt character is counted in ``prompt_chars`` so input
+    size can be compared across code paths. With ``output_chars_per_second``
+    the sleep also grows with the response length, like decoding does.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0, seed=0, output_chars_per_second=None):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.output_chars_per_second = output_chars_per_second
+        self.calls = 0
+        self.errors = 0
+        self.prompt_chars = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._serial = 0
+
+    def respond(self, prompt):
+        with self._lock:
+            self.calls += 1
+            self.prompt_chars += len(prompt)
+            fail = self._random.random() < self.error_rate
+            if fail:
+                self.errors += 1
+            self._serial += 1
+            serial = self._serial
+
+        text = None if fail else self._answer(prompt, serial)
+        delay = self.latency
+        if text and self.output_chars_per_second:
+            delay += len(text) / self.output_chars_per_second
+        if delay:
+            time.sleep(delay)
+        if fail:
+            raise RuntimeError("fake LLM error")
+        return text
+
+    def _answer(self, prompt, serial):
+        if '주요 단어와 숙어' in prompt:
+            return json.dumps([
+                {"word": f"単語{i}", "meaning": f"단어{i}", "pronunciation": f"탄고{i}"}
+                for i in range(20)
+            ], ensure_ascii=False)
+
+        batch = re.search(r'각각 (\d+)문제씩 만들어주세요: ([^.]+)\.', prompt)
+        if batch:
+            count = int(batch.group(1))
+            return json.dumps({
+                difficulty: self._questions(f"{serial}{difficulty[0]}", count)
+                for difficulty in batch.group(2).split(', ')
+            }, ensure_ascii=False)
+
+        match = re.search(r'(\d+)문제', prompt)
+        return json.dumps(self._questions(serial, int(match.group(1)) if match else 10), ensure_ascii=False)
+
+    @staticmethod
+    def _questions(prefix, count):
+        # The correct option is always CORRECT_OPTION, rotated to answer_index,
+        # so clients that only see the rendered page can still answer right.
+        return [
+            {
+                "question": f"[{prefix}-{i}] 다음 중 올바른 표현은?",
+                "options": list(OPTIONS[5 - i % 5:] + OPTIONS[:5 - i % 5]),
+                "answer_index": i % 5,
+                "explanation": "'食べる'(타베루, 먹다)가 정답입니다.",
+                "type": "문법",
+            }
+            for i in range(count)
+        ]
+
+
+def install_fake_genai(llm):
+    """Replace ``google.generativeai`` with a module backed by ``llm``.
+
+    Returns a callable that restores the previous module.
+    """
+    class Response:
+        def __init__(self, prompt, text):
+            self.text = text
+            self.usage_metadata = types.SimpleNamespace(
+                prompt_token_count=estimate_tokens(prompt),
+                candidates_token_count=estimate_tokens(text),
+            )
+
+    class GenerativeModel:
+        def __init__(self, model_name=None, **kwargs):
+            self.model_name = model_name
+            self._cached = None
+
+        @classmethod
+        def from_cached_content(cls, cached_content, **kwargs):
+            model = cls(cached_content.model)
+            model._cached = cached_content
+            return model
+
+        def generate_content(self, prompt, **kwargs):
+            # With a cached context only the request is sent; the cached part
+            # was counted once in CachedContent.create.
+            return Response(prompt, llm.respond(prompt))
+
+    class CachedContent:
+        def __init__(self, model, system_instruction, contents):
+            self.model = model
+            self.system_instruction = system_instruction
+            self.contents = contents
+
+        @classmethod
+        def create(cls, model, system_instruction=None, contents=None, **kwargs):
+            with llm._lock:
+                llm.prompt_chars += len(system_instruction or '') + sum(len(c) for c in contents or [])
+            return cls(model, system_instruction, contents)
+
+        def delete(self):
+            pass
+
+    genai = types.ModuleType('google.generativeai')
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = GenerativeModel
+    caching = types.ModuleType('google.generativeai.caching')
+    caching.CachedContent = CachedContent
+    genai.caching = caching
+
+    try:
+        import google
+    except ImportError:
+        google = types.ModuleType('google')
+        google.__path__ = []
+        sys.modules['google'] = google
+
+    saved = {name: sys.modules.get(name) for name in ('google.generativeai', 'google.generativeai.caching')}
+    saved_attr = getattr(google, 'generativeai', None)
+    sys.modules['google.generativeai'] = genai
+    sys.modules['google.generativeai.caching'] = caching
+    google.generativeai = genai
+
+    def restore():
+        for name, module in saved.items():
+            if module is None:
+                sys.modules.pop(name, None)
+            else:
+                sys.modules[name] = module
+        if saved_attr is None:
+            del google.generativeai
+        else:
+            google.generativeai = saved_attr
+
+    return restore
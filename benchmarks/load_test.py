@@ -0,0 +1,395 @@
+"""Concurrent-session load test for streamlit_app.py.
+
+Starts one real ``streamlit run`` server (benchmarks/serve_fake.py, with a
+fake Gemini of configurable latency and error rate) against a local fake
+Google Docs export server, then drives N simulated learners through
+dashboard -> quiz -> wrong notes -> vocabulary. Each learner is a thread
+with its own websocket session, like a browser tab, so all of them share
+the server's runtime, st.cache_data / st.cache_resource caches (context
+cache, lesson index, passage index) and their locks.
+
+    python -m benchmarks.load_test --users 8 --latency 0.2 --output load.json
+    python -m benchmarks.load_test --users 8 --baseline load.json
+
+With ``--baseline`` the run exits non-zero when any action's p95 regresses by
+more than ``--tolerance``.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from pathlib import Path
+
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+from websockets.sync.client import connect
+
+from benchmarks.fakes import CORRECT_OPTION, FakeDocsServer
+
+ROOT = Path(__file__).resolve().parent.parent
+SAMPLE_DOC = ROOT / 'doc_export.txt'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid):
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError):
+        out = subprocess.run(['ps', '-o', 'rss=', '-p', str(pid)], capture_output=True, text=True).stdout
+        return int(out.strip() or 0) / 1024
+
+
+class AppServer:
+    """The app under ``streamlit run`` in a child process."""
+
+    def __init__(self, docs_url, args):
+        self.port = free_port()
+        self.url = f"ws://127.0.0.1:{self.port}/_stcore/stream"
+        self.docs_url = docs_url
+        self.args = args
+        self.stats_path = Path(tempfile.mkdtemp(prefix='load-test-')) / 'llm.json'
+        self.process = None
+        self.log = None
+
+    def start(self):
+        self.log = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'benchmarks.serve_fake', '--port', str(self.port),
+             '--latency', str(self.args.latency), '--error-rate', str(self.args.error_rate),
+             '--seed', str(self.args.seed), '--stats', str(self.stats_path)],
+            cwd=ROOT, env={**os.environ, 'DOCS_EXPORT_URL': self.docs_url},
+            stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + self.args.timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                self.log.seek(0)
+                raise RuntimeError(f"streamlit exited early:\n{self.log.read().decode(errors='replace')}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1):
+                    return self
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("streamlit did not become healthy in time")
+
+    def rss_mb(self):
+        return rss_mb(self.process.pid)
+
+    def stop(self):
+        """Stop the server and return its LLM counters."""
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+        try:
+            return json.loads(self.stats_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {'calls': 0, 'errors': 0, 'prompt_chars': 0}
+
+
+class MemorySampler:
+    def __init__(self, server, interval=0.1):
+        self.server = server
+        self.interval = interval
+        self.start_mb = server.rss_mb()
+        self.peak_mb = self.start_mb
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, self.server.rss_mb())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.end_mb = self.server.rss_mb()
+        self.peak_mb = max(self.peak_mb, self.end_mb)
+
+
+class Session:
+    """One browser tab: reruns the script over the websocket and keeps the
+    elements of the latest run, like the frontend does.
+    """
+
+    def __init__(self, url, timeout):
+        self._stack = ExitStack()
+        self.ws = self._stack.enter_context(
+            connect(url, subprotocols=['streamlit'], max_size=None, open_timeout=timeout)
+        )
+        self.timeout = timeout
+        self.widgets = {}   # widget id -> WidgetState sent with every rerun
+        self.elements = {}  # delta path -> Element, latest run only
+        self.reruns = 0
+        self.exceptions = []
+
+    def rerun(self, trigger=None):
+        msg = BackMsg()
+        widgets = msg.rerun_script.widget_states.widgets
+        widgets.extend(self.widgets.values())
+        if trigger is not None:
+            widgets.add(id=trigger, trigger_value=True)
+        self.ws.send(msg.SerializeToString())
+
+        # Read until a run finishes without chaining into an st.rerun().
+        while True:
+            forward = ForwardMsg()
+            forward.ParseFromString(self.ws.recv(timeout=self.timeout))
+            kind = forward.WhichOneof('type')
+            if kind == 'new_session':
+                self.reruns += 1
+                self.elements = {}
+            elif kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                self.elements[tuple(forward.metadata.delta_path)] = element
+                if element.WhichOneof('type') == 'exception':
+                    self.exceptions.append(element.exception.message)
+            elif kind == 'script_finished' and forward.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return
+
+    def set_value(self, widget_id, **value):
+        self.widgets[widget_id] = WidgetState(id=widget_id, **value)
+
+    def find(self, kind, label=None, key=None):
+        for path in sorted(self.elements):
+            element = self.elements[path]
+            if element.WhichOneof('type') != kind:
+                continue
+            widget = getattr(element, kind)
+            # Keyed widget ids end with the user key.
+            if key is not None and widget.id.endswith(key):
+                return widget
+            if label is not None and (widget.label == label or widget.label.endswith(label)):
+                return widget
+        return None
+
+    def close(self):
+        self._stack.close()
+
+
+class SimulatedUser:
+    def __init__(self, index, args, url):
+        self.index = index
+        self.args = args
+        self.random = random.Random(args.seed + index)
+        self.samples = []  # (action, seconds, reruns)
+        self.failures = []
+        self.session = Session(url, args.timeout)
+
+    def act(self, action, trigger=None):
+        session = self.session
+        session.reruns = 0
+        errors = len(session.exceptions)
+        start = time.perf_counter()
+        session.rerun(trigger)
+        self.samples.append((action, time.perf_counter() - start, session.reruns))
+        if len(session.exceptions) > errors:
+            self.failures.append(f"{action}: {session.exceptions[-1]}")
+
+    def click(self, action, label=None, key=None):
+        button = self.session.find('button', label=label, key=key)
+        if button is None or button.disabled:
+            self.failures.append(f"{action}: button {key or label!r} missing")
+            return False
+        self.act(action, trigger=button.id)
+        return True
+
+    def answer_questions(self, mode):
+        for i in range(self.args.answers):
+            radio = self.session.find('radio', key=f"q_{mode}_{i}")
+            if radio is None:
+                return
+            if self.random.random() < self.args.accuracy:
+                choice = CORRECT_OPTION
+            else:
+                choice = self.random.choice([o for o in radio.options if o != CORRECT_OPTION])
+
+            self.session.set_value(radio.id, string_value=choice)
+            self.act('select')
+            if not self.click('check', key=f"check_{mode}") or not self.click('next', key=f"next_{mode}"):
+                return
+
+        if self.session.find('button', key=f"stop_{mode}") is not None:
+            self.click('stop', key=f"stop_{mode}")
+
+    def run(self):
+        try:
+            for _ in range(self.args.rounds):
+                self.act('dashboard')
+
+                if self.click('start_quiz', label='전체 복습하기'):
+                    self.answer_questions('quiz')
+
+                review_label = '오답 노트 복습 시작하기 (Start Review)'
+                if self.session.find('button', label=review_label) is not None:
+                    self.click('start_review', label=review_label)
+                    self.answer_questions('wrong_note')
+
+                self.click('vocabulary', label='단어장 생성')
+        except Exception as e:
+            self.failures.append(f"session {self.index}: {e!r}")
+        finally:
+            self.session.close()
+        return self
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def summarize(users, wall, memory, llm, docs, args):
+    by_action = {}
+    for user in users:
+        for action, seconds, reruns in user.samples:
+            by_action.setdefault(action, []).append((seconds, reruns))
+
+    actions = {}
+    for action, rows in by_action.items():
+        times = sorted(s * 1000 for s, _ in rows)
+        reruns = [r for _, r in rows]
+        actions[action] = {
+            'count': len(rows),
+            'p50_ms': round(percentile(times, 0.50), 2),
+            'p95_ms': round(percentile(times, 0.95), 2),
+            'p99_ms': round(percentile(times, 0.99), 2),
+            'mean_ms': round(sum(times) / len(times), 2),
+            'reruns_total': sum(reruns),
+            'reruns_mean': round(sum(reruns) / len(reruns), 2),
+        }
+
+    total = sum(a['count'] for a in actions.values())
+    return {
+        'config': {
+            'users': args.users, 'rounds': args.rounds, 'answers': args.answers,
+            'latency': args.latency, 'error_rate': args.error_rate,
+            'accuracy': args.accuracy, 'seed': args.seed,
+        },
+        'wall_s': round(wall, 3),
+        'actions_total': total,
+        'throughput_actions_per_s': round(total / wall, 2) if wall else 0.0,
+        'actions': actions,
+        # Server process RSS: baseline after a warm-up dashboard run (imports
+        # and shared caches loaded), then what the concurrent sessions added.
+        'memory': {
+            'rss_baseline_mb': round(memory.start_mb, 1),
+            'rss_peak_mb': round(memory.peak_mb, 1),
+            'rss_end_mb': round(memory.end_mb, 1),
+            'growth_per_session_mb': round((memory.end_mb - memory.start_mb) / args.users, 2),
+            'peak_growth_per_session_mb': round((memory.peak_mb - memory.start_mb) / args.users, 2),
+        },
+        'llm': llm,
+        'doc_requests': docs.requests,
+        'failures': [f for user in users for f in user.failures],
+    }
+
+
+def compare(report, baseline, tolerance):
+    regressions = []
+    for action, stats in report['actions'].items():
+        base = baseline.get('actions', {}).get(action)
+        if not base or not base['p95_ms']:
+            continue
+        if stats['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{action}: p95 {base['p95_ms']}ms -> {stats['p95_ms']}ms")
+    return regressions
+
+
+def print_report(report):
+    print(f"{'action':<14}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'reruns':>8}")
+    for action, s in report['actions'].items():
+        print(f"{action:<14}{s['count']:>6}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['reruns_mean']:>8}")
+    m = report['memory']
+    print(f"\n{report['actions_total']} actions in {report['wall_s']}s "
+          f"({report['throughput_actions_per_s']} actions/s)")
+    print(f"Server RSS {m['rss_baseline_mb']} MB after warm-up, {m['rss_end_mb']} MB at end "
+          f"(peak {m['rss_peak_mb']} MB): {m['growth_per_session_mb']} MB per session "
+          f"(peak {m['peak_growth_per_session_mb']} MB)")
+    print(f"LLM calls {report['llm']['calls']} (errors {report['llm']['errors']}), "
+          f"doc fetches {report['doc_requests']}")
+    if report['failures']:
+        print(f"{len(report['failures'])} failures, first: {report['failures'][0]}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--rounds', type=int, default=1)
+    parser.add_argument('--answers', type=int, default=3, help='questions answered per quiz')
+    parser.add_argument('--latency', type=float, default=0.05, help='fake LLM latency (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--doc-latency', type=float, default=0.0, help='fake export latency (s)')
+    parser.add_argument('--accuracy', type=float, default=0.6)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--doc', default=str(SAMPLE_DOC), help='export text served for every doc id')
+    parser.add_argument('--output', help='write the JSON report here')
+    parser.add_argument('--baseline', help='previous JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    docs = FakeDocsServer(default=Path(args.doc).read_text(encoding='utf-8'), latency=args.doc_latency)
+    with docs:
+        server = AppServer(docs.url_template, args).start()
+        try:
+            # Warm-up: the first run pays for imports and fills the shared caches.
+            warmup = Session(server.url, args.timeout)
+            warmup.rerun()
+            warmup.close()
+
+            with MemorySampler(server) as memory:
+                start = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=args.users) as pool:
+                    users = list(pool.map(
+                        lambda i: SimulatedUser(i, args, server.url).run(), range(args.users)
+                    ))
+                wall = time.perf_counter() - start
+        finally:
+            llm = server.stop()
+
+    report = summarize(users, wall, memory, llm, docs, args)
+    print_report(report)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare(report, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
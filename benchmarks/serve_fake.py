@@ -0,0 +1,60 @@
+"""Run streamlit_app.py under ``streamlit run`` with the fake Gemini installed.
+
+Used by the load test so every simulated learner talks to one real server
+(one runtime, one set of st.cache_data / st.cache_resource caches):
+
+    python -m benchmarks.serve_fake --port 8599 --latency 0.2 --stats llm.json
+
+LLM counters are written to ``--stats`` when the server shuts down.
+"""
+import argparse
+import atexit
+import json
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.fakes import FakeLLM, install_fake_genai
+
+ROOT = Path(__file__).resolve().parent.parent
+APP_PATH = ROOT / 'streamlit_app.py'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--latency', type=float, default=0.0, help='fake LLM latency (s)')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--stats', help='write LLM call counts here on exit')
+    args = parser.parse_args(argv)
+
+    llm = FakeLLM(latency=args.latency, error_rate=args.error_rate, seed=args.seed)
+    install_fake_genai(llm)
+
+    if args.stats:
+        def write_stats():
+            stats = {'calls': llm.calls, 'errors': llm.errors, 'prompt_chars': llm.prompt_chars}
+            Path(args.stats).write_text(json.dumps(stats), encoding='utf-8')
+
+        atexit.register(write_stats)
+
+    secrets = Path(tempfile.mkdtemp(prefix='load-test-')) / 'secrets.toml'
+    secrets.write_text('GOOGLE_API_KEY = "fake-key"\n', encoding='utf-8')
+
+    from streamlit.web import cli
+
+    sys.argv = [
+        'streamlit', 'run', str(APP_PATH),
+        '--server.port', str(args.port),
+        '--server.address', '127.0.0.1',
+        '--server.headless', 'true',
+        '--server.fileWatcherType', 'none',
+        '--browser.gatherUsageStats', 'false',
+        '--secrets.files', str(secrets),
+    ]
+    return cli.main()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,204 @@
+import abc
+import datetime
+import hashlib
+import threading
+import time
+
+# Gemini refuses to cache contexts below its minimum token count, so short
+# lesson notes are sent inline instead of being registered.
+MIN_CACHE_CHARS = 4000
+DEFAULT_TTL_SECONDS = 3600
+# Treat an entry as expired slightly early so we never reference a context
+# the server is about to drop.
+EXPIRY_MARGIN_SECONDS = 30
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class CachedContext:
+    __slots__ = ('key', 'content_hash', 'handle', 'created_at', 'expires_at')
+
+    def __init__(self, key, content_hash, handle, created_at, expires_at):
+        self.key = key
+        self.content_hash = content_hash
+        self.handle = handle
+        self.created_at = created_at
+        self.expires_at = expires_at
+
+
+class ContextCache(abc.ABC):
+    """Registers an instruction block + lesson notes once and reuses it.
+
+    Entries are keyed by the caller (e.g. ``(doc_id, difficulty)``) and bound
+    to the content hash they were created from: when a document changes, the
+    old context is deleted and a new one is registered on the next request.
+    Subclasses provide ``_create``, ``_generate`` and ``_delete``.
+    """
+
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'expired': 0}
+        self._entries = {}
+        self._pending = {}  # key -> Event set when its registration finishes
+        self._lock = threading.Lock()
+
+    def get_or_register(self, key, system_instruction, content):
+        """Return a live entry for ``key``, registering the context if needed.
+
+        The lock only guards the bookkeeping: uploads and deletes run outside
+        it, and concurrent callers for the same key wait for the one
+        registration in flight instead of uploading twice.
+        """
+        digest = content_hash(system_instruction + '\0' + content)
+        while True:
+            with self._lock:
+                # Leave the entry alone while someone registers this key:
+                # whatever they store is what we compare against.
+                pending = self._pending.get(key)
+                if pending is None:
+                    stale = None
+                    entry = self._entries.get(key)
+                    if entry is not None:
+                        if entry.content_hash != digest:
+                            self.stats['invalidations'] += 1
+                            stale = self._entries.pop(key)
+                        elif entry.expires_at - EXPIRY_MARGIN_SECONDS <= self.clock():
+                            self.stats['expired'] += 1
+                            stale = self._entries.pop(key)
+                        else:
+                            self.stats['hits'] += 1
+                            return entry
+
+                    pending = self._pending[key] = threading.Event()
+                    self.stats['misses'] += 1
+                    break
+            # Someone else is registering this key; look again when they're done.
+            pending.wait()
+
+        entry = None
+        try:
+            if stale is not None:
+                self._delete_quietly(stale)
+            now = self.clock()
+            handle = self._create(key, system_instruction, content)
+            entry = CachedContext(key, digest, handle, now, now + self.ttl_seconds)
+            return entry
+        finally:
+            # Publishing the entry and clearing the guard happen together, so
+            # no caller can see the key neither pending nor registered.
+            with self._lock:
+                if entry is not None:
+                    self._entries[key] = entry
+                self._pending.pop(key, None)
+            pending.set()
+
+    def generate(self, entry, prompt, **kwargs):
+        return self._generate(entry.handle, prompt, **kwargs)
+
+    def is_missing(self, error):
+        """True if ``error`` (raised by ``generate``) means the cached context
+        no longer exists, so invalidating it is the right response. Rate
+        limits, server errors and blocked responses leave the entry alone.
+        """
+        return False
+
+    def invalidate(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._delete_quietly(entry)
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._delete_quietly(entry)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _delete_quietly(self, entry):
+        try:
+            self._delete(entry.handle)
+        except Exception as e:
+            # The server may already have expired it; nothing else to do.
+            print(f"Failed to delete cached context {entry.key}: {e}")
+
+    @abc.abstractmethod
+    def _create(self, key, system_instruction, content):
+        """Register the context and return a handle for ``_generate``."""
+
+    @abc.abstractmethod
+    def _generate(self, handle, prompt, **kwargs):
+        """Run ``prompt`` against a registered context; return the text."""
+
+    @abc.abstractmethod
+    def _delete(self, handle):
+        """Release a registered context."""
+
+
+class GeminiContextCache(ContextCache):
+    """Backed by Gemini explicit caching (``google.generativeai.caching``)."""
+
+    def __init__(self, model_name, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.time):
+        super().__init__(ttl_seconds=ttl_seconds, clock=clock)
+        self.model_name = model_name if model_name.startswith('models/') else f"models/{model_name}"
+
+    def _create(self, key, system_instruction, content):
+        from google.generativeai import caching
+
+        return caching.CachedContent.create(
+            model=self.model_name,
+            display_name=str(key)[:128],
+            system_instruction=system_instruction,
+            contents=[content],
+            ttl=datetime.timedelta(seconds=self.ttl_seconds),
+        )
+
+    def _generate(self, handle, prompt, **kwargs):
+        import google.generativeai as genai
+
+        model = genai.GenerativeModel.from_cached_content(cached_content=handle)
+        return model.generate_content(prompt, **kwargs).text
+
+    def _delete(self, handle):
+        handle.delete()
+
+    def is_missing(self, error):
+        # Gemini answers 404, or 403 "CachedContent not found (or permission
+        # denied)", for a context that expired or was deleted server-side.
+        try:
+            from google.api_core import exceptions
+        except ImportError:
+            return False
+        return isinstance(error, (exceptions.NotFound, exceptions.PermissionDenied))
+
+
+class LocalContextCache(ContextCache):
+    """In-process stand-in for tests and offline runs.
+
+    ``responder(system_instruction, content, prompt)`` plays the model. The
+    number of characters that would have been uploaded is tracked in
+    ``sent_chars`` so cached and uncached runs can be compared.
+    """
+
+    def __init__(self, responder, ttl_seconds=DEFAULT_TTL_SECONDS, clock=time.time):
+        super().__init__(ttl_seconds=ttl_seconds, clock=clock)
+        self.responder = responder
+        self.sent_chars = 0
+        self.deleted = 0
+
+    def _create(self, key, system_instruction, content):
+        self.sent_chars += len(system_instruction) + len(content)
+        return {'system_instruction': system_instruction, 'content': content}
+
+    def _generate(self, handle, prompt, **kwargs):
+        self.sent_chars += len(prompt)
+        return self.responder(handle['system_instruction'], handle['content'], prompt)
+
+    def _delete(self, handle):
+        self.deleted += 1
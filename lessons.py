@@ -0,0 +1,206 @@
+import bisect
+import calendar
+import datetime
+import re
+import threading
+from collections import namedtuple
+
+from local_corpus import ExportBuffer
+
+_year_month = re.compile(r'(\d{4})\D{1,3}(\d{1,2})')
+_year = re.compile(r'(\d{4})')
+_range = re.compile(r'^\s*(\d{4})-(\d{1,2})(?:-(\d{1,2}))?\s*\.\.\s*(\d{4})-(\d{1,2})(?:-(\d{1,2}))?\s*$')
+_last = re.compile(r'^\s*last\s+(\d+)\s+(day|week)s?\s*$')
+
+
+class Lesson(namedtuple('Lesson', 'id doc_id year date byte_length source')):
+    """One dated lesson. Immutable; the text (and its hash) are read from
+    ``source`` on demand, so indexing a mapped archive touches no lesson bytes.
+    """
+
+    __slots__ = ()
+
+    @property
+    def content(self):
+        return self.source.content
+
+    @property
+    def content_hash(self):
+        return self.source.digest()
+
+
+def doc_year_month(name):
+    """(year, month) a document covers, from names like "2025년 3월" or "2025/03".
+
+    Either part is None when the name does not say.
+    """
+    match = _year_month.search(name or '')
+    if match and 1 <= int(match.group(2)) <= 12:
+        return int(match.group(1)), int(match.group(2))
+    match = _year.search(name or '')
+    return (int(match.group(1)), None) if match else (None, None)
+
+
+def lesson_date(marker, year, doc_month=None):
+    """Resolve an "MM-DD" marker to a date. Returns None for impossible months
+    (``build_lessons`` then files the lesson under the previous one's date).
+
+    A January lesson in a December notebook belongs to the next year (and
+    vice versa), so months far from the document's month roll the year.
+    """
+    month, day = (int(part) for part in marker.split('-'))
+    if not 1 <= month <= 12:
+        return None
+    if doc_month is not None:
+        if month < doc_month - 6:
+            year += 1
+        elif month > doc_month + 6:
+            year -= 1
+    day = min(max(day, 1), calendar.monthrange(year, month)[1])
+    return datetime.date(year, month, day)
+
+
+def build_lessons(doc_id, export, name=None, default_year=None):
+    year, doc_month = doc_year_month(name)
+    if year is None:
+        year = default_year or datetime.date.today().year
+
+    lessons = []
+    seen = {}
+    for ref in export.lessons:
+        date = lesson_date(ref.date, year, doc_month)
+        if date is None:
+            # A mistyped marker (e.g. "@ 13-01") still has notes under it:
+            # keep them with the lesson before, or at the start of the document.
+            date = lessons[-1].date if lessons else datetime.date(year, doc_month or 1, 1)
+        lesson_id = f"{doc_id}/{date.isoformat()}"
+        # Two entries for the same day stay separate lessons.
+        seen[lesson_id] = seen.get(lesson_id, 0) + 1
+        if seen[lesson_id] > 1:
+            lesson_id = f"{lesson_id}#{seen[lesson_id]}"
+        lessons.append(Lesson(lesson_id, doc_id, date.year, date, ref.byte_length, ref))
+    return lessons
+
+
+def parse_doc(text, doc_id='', name=None):
+    """Parse export text into Lesson records (content is read lazily)."""
+    return build_lessons(doc_id, ExportBuffer(text, name=name or doc_id), name=name)
+
+
+def parse_period(spec, today):
+    """Turn "2025-03..2025-06", "2025-03-01..2025-03-31" or "last 4 weeks"
+    (ending at ``today``) into an inclusive ``(start, end)`` date pair.
+    """
+    match = _range.match(spec)
+    if match:
+        y1, m1, d1, y2, m2, d2 = match.groups()
+        start = datetime.date(int(y1), int(m1), int(d1 or 1))
+        end_day = int(d2) if d2 else calendar.monthrange(int(y2), int(m2))[1]
+        return start, datetime.date(int(y2), int(m2), end_day)
+
+    match = _last.match(spec.lower())
+    if match:
+        days = int(match.group(1)) * (7 if match.group(2) == 'week' else 1)
+        return today - datetime.timedelta(days=days - 1), today
+
+    raise ValueError(f"Unrecognized period: {spec!r}")
+
+
+class LessonIndex:
+    """All known lessons, by id and sorted by date.
+
+    ``update_document`` replaces a document's lessons only when the export's
+    signature changed, so callers can hand it the same export on every rerun.
+
+    The index is shared across sessions. Writers build new ``_keys`` and
+    ``_by_id`` objects and swap them in under the lock; readers take both from
+    one ``_snapshot``, so they never see a half-applied update.
+    """
+
+    def __init__(self):
+        self._by_id = {}
+        self._keys = []      # sorted (date, id)
+        self._docs = {}      # doc_id -> (signature, [Lesson, ...])
+        self._lock = threading.Lock()
+
+    def update_document(self, doc_id, export, name=None):
+        """Index ``export`` under ``doc_id``. Returns True if anything changed."""
+        current = self._docs.get(doc_id)
+        if current is not None and current[0] == export.signature:
+            return False
+
+        lessons = build_lessons(doc_id, export, name=name)
+        with self._lock:
+            # Another session may have indexed this export while we were building.
+            current = self._docs.get(doc_id)
+            if current is not None and current[0] == export.signature:
+                return False
+            self._replace(doc_id, current, lessons)
+            self._docs[doc_id] = (export.signature, lessons)
+        return True
+
+    def remove_document(self, doc_id):
+        """Forget a document (e.g. its export was deleted). Returns True if it was indexed."""
+        with self._lock:
+            current = self._docs.pop(doc_id, None)
+            if current is None:
+                return False
+            self._replace(doc_id, current, [])
+        return True
+
+    def _replace(self, doc_id, current, lessons):
+        # Called with the lock held.
+        stale = {lesson.id for lesson in current[1]} if current is not None else set()
+        by_id = {lesson_id: lesson for lesson_id, lesson in self._by_id.items() if lesson_id not in stale}
+        by_id.update((lesson.id, lesson) for lesson in lessons)
+        keys = [key for key in self._keys if key[1] not in stale]
+        keys.extend((lesson.date, lesson.id) for lesson in lessons)
+        keys.sort()
+        self._keys, self._by_id = keys, by_id
+
+    def _snapshot(self):
+        with self._lock:
+            return self._keys, self._by_id
+
+    def signature(self, doc_id):
+        current = self._docs.get(doc_id)
+        return current[0] if current is not None else None
+
+    def __contains__(self, doc_id):
+        return doc_id in self._docs
+
+    def __len__(self):
+        return len(self._snapshot()[1])
+
+    def get(self, lesson_id):
+        return self._snapshot()[1].get(lesson_id)
+
+    def lessons(self, doc_id=None):
+        """A document's lessons in file order, or every lesson by date."""
+        if doc_id is not None:
+            return list(self._docs.get(doc_id, (None, []))[1])
+        keys, by_id = self._snapshot()
+        return [by_id[lesson_id] for _, lesson_id in keys]
+
+    def range(self, start=None, end=None):
+        """Lessons dated within ``[start, end]`` (either bound optional), by date."""
+        keys, by_id = self._snapshot()
+        lo = 0 if start is None else bisect.bisect_left(keys, (start, ''))
+        hi = len(keys) if end is None else bisect.bisect_right(keys, (end, '\uffff'))
+        return [by_id[lesson_id] for _, lesson_id in keys[lo:hi]]
+
+    def period(self, spec, today=None):
+        """Lessons in a ``parse_period`` spec. "last N weeks" counts back from
+        ``today``, or from the newest lesson when not given, since archives
+        are often reviewed long after the last class.
+        """
+        if today is None:
+            latest = self.latest()
+            if latest is None:
+                return []
+            today = latest.date
+        return self.range(*parse_period(spec, today))
+
+    def latest(self):
+        keys, by_id = self._snapshot()
+        return by_id[keys[-1][1]] if keys else None
@@ -0,0 +1,177 @@
+import hashlib
+import mmap
+import os
+import re
+import threading
+from pathlib import Path
+
+# Same markers parse_doc looks for ("@ MM-DD" at the start of a stripped
+# line), matched on raw bytes. A UTF-8 BOM before the first marker is allowed.
+MARKER_PATTERN = re.compile(rb'^(?:\xef\xbb\xbf)?[ \t]*@[ \t]*(\d{1,2}-\d{1,2})', re.MULTILINE)
+
+
+def normalize_lesson(text):
+    """Same cleanup parse_doc applies: strip lines and drop empty ones."""
+    return '\n'.join(line.strip() for line in text.split('\n') if line.strip()).strip()
+
+
+def file_signature(stat):
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class LessonRef:
+    """A lesson located by byte offsets; its text is read on first access."""
+
+    __slots__ = ('export', 'date', 'start', 'end', '_content', '_digest')
+
+    def __init__(self, export, date, start, end):
+        self.export = export
+        self.date = date
+        self.start = start
+        self.end = end
+        self._content = None
+        self._digest = None
+
+    @property
+    def byte_length(self):
+        return self.end - self.start
+
+    @property
+    def content(self):
+        if self._content is None:
+            self._content = normalize_lesson(self.export.read(self.start, self.end))
+        return self._content
+
+    def digest(self):
+        if self._digest is None:
+            self._digest = self.export.digest(self.start, self.end)
+        return self._digest
+
+    def __repr__(self):
+        return f"LessonRef({self.export.name!r}, {self.date!r}, {self.start}..{self.end})"
+
+
+class ExportBuffer:
+    """Export text held in memory (e.g. a Google Docs download).
+
+    ``signature`` changes whenever the content does, so indexes can skip
+    re-reading an unchanged export.
+    """
+
+    def __init__(self, data, name='<memory>'):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self.name = name
+        self.lessons = []
+        self._map = data
+        self.signature = hashlib.sha1(data).hexdigest()
+        self._scan()
+
+    def _scan(self):
+        if not self._map:
+            return
+        matches = list(MARKER_PATTERN.finditer(self._map))
+        size = len(self._map)
+        for i, match in enumerate(matches):
+            # Text after the marker on the same line is not part of the lesson.
+            line_end = self._map.find(b'\n', match.end())
+            start = size if line_end == -1 else line_end + 1
+            end = matches[i + 1].start() if i + 1 < len(matches) else size
+            date = match.group(1).decode('ascii')
+            self.lessons.append(LessonRef(self, date, start, max(start, end)))
+
+    def read(self, start, end):
+        return self._map[start:end].decode('utf-8', errors='replace')
+
+    def digest(self, start, end):
+        with memoryview(self._map) as view:
+            return hashlib.sha1(view[start:end]).hexdigest()
+
+    def doc_data(self):
+        """Lessons grouped like parse_doc's result: ``{MM: [LessonRef, ...]}``."""
+        lessons = {}
+        for lesson in self.lessons:
+            month = lesson.date.split('-')[0].zfill(2)
+            lessons.setdefault(month, []).append(lesson)
+        return lessons
+
+    def close(self):
+        pass
+
+
+class ExportFile(ExportBuffer):
+    """One exported notebook, memory-mapped and scanned for lesson markers.
+
+    Only marker positions are kept; lesson bodies stay in the page cache
+    until ``LessonRef.content`` asks for them.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.name = self.path.name
+        self.lessons = []
+        self._file = open(self.path, 'rb')
+        # Stat the open descriptor so the signature matches what gets mapped.
+        self.signature = file_signature(os.fstat(self._file.fileno()))
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file: nothing to map.
+            self._map = None
+        self._scan()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def read(self, start, end):
+        if self._map is not None and self._map.closed:
+            raise ValueError(f"{self.name} was re-exported or deleted; reload the document")
+        return super().read(start, end)
+
+
+class LocalCorpus:
+    """A directory of exported notebooks (``*.txt``, searched recursively).
+
+    Documents are named by their path relative to the root without the
+    suffix (e.g. ``2025/03`` or ``2025년 3월``) and mapped on first use.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.paths = {
+            str(p.relative_to(self.root).with_suffix('')): p
+            for p in sorted(self.root.rglob('*.txt'))
+        }
+        self._exports = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        return list(self.paths)
+
+    def export(self, name):
+        """The mapped export for ``name``, or None if the file is gone.
+
+        The file is stat'ed on every call: a re-exported (rewritten,
+        truncated or appended) file is mapped again, since reading through
+        the old map past the new end of file kills the process with SIGBUS.
+        """
+        with self._lock:
+            current = self._exports.get(name)
+            try:
+                stat = os.stat(self.paths[name])
+            except FileNotFoundError:
+                stat = None
+            if current is not None and (stat is None or current.signature != file_signature(stat)):
+                current.close()
+                del self._exports[name]
+                current = None
+            if current is None and stat is not None:
+                current = self._exports[name] = ExportFile(self.paths[name])
+            return current
+
+    def close(self):
+        for export in self._exports.values():
+            export.close()
+        self._exports.clear()
@@ -0,0 +1,82 @@
+import json
+import random
+
+from retrieval import MASTERY_THRESHOLD, weakness_queries
+
+# Prompt budgets: one document's notes, the random Grand Exam sample, and the
+# weakness-targeted Grand Exam passages.
+QUIZ_CONTEXT_CHARS = 30000
+EXAM_SAMPLE_CHARS = 35000
+WEAKNESS_CONTEXT_CHARS = 15000
+
+
+def new_history():
+    return {
+        'mastery': {},  # "question_text": correct_count (int)
+        'wrong_notes': [],  # List of {question, options, answer_index, explanation, your_answer}
+        'vocab_list': []    # List of {word, meaning, pronunciation}
+    }
+
+
+def filter_unmastered(questions, mastery):
+    # If mastered (>= MASTERY_THRESHOLD correct), skip
+    return [q for q in questions if mastery.get(q['question'], 0) < MASTERY_THRESHOLD]
+
+
+def record_answer(history, q, is_correct, mode):
+    """Update mastery and wrong notes for one answer.
+
+    Only normal quizzes count: reviewing wrong notes changes nothing. Returns
+    the question's new mastery count, or None in wrong-note mode.
+    """
+    if mode != 'quiz':
+        return None
+
+    if is_correct:
+        history['mastery'][q['question']] = history['mastery'].get(q['question'], 0) + 1
+    else:
+        # Stricter: a wrong answer resets the streak.
+        history['mastery'][q['question']] = 0
+
+        # Add to Wrong Notes if not already present (distinct by question text)
+        exists = any(wn['question'] == q['question'] for wn in history['wrong_notes'])
+        if not exists:
+            history['wrong_notes'].append(q.copy())
+
+    return history['mastery'][q['question']]
+
+
+def serialize_progress(history):
+    return json.dumps(history, ensure_ascii=False, indent=2)
+
+
+def build_quiz_context(lessons, max_chars=QUIZ_CONTEXT_CHARS):
+    """Lesson notes for a single-document quiz."""
+    return "\n\n".join(l.content for l in lessons)[:max_chars]
+
+
+def build_exam_context(lesson_index, passage_index, doc_ids, history, rng=random):
+    """Lesson notes for the Grand Exam.
+
+    Passages similar to the user's wrong notes / unmastered questions come
+    first; without any, a random sample of all lessons is used.
+    """
+    for doc_id in doc_ids:
+        if doc_id in lesson_index:
+            passage_index.update_document(
+                doc_id,
+                (l.content for l in lesson_index.lessons(doc_id)),
+                doc_hash=lesson_index.signature(doc_id),
+            )
+
+    if not len(lesson_index):
+        return ""
+
+    passages = passage_index.select_passages(weakness_queries(history), WEAKNESS_CONTEXT_CHARS)
+    if passages:
+        return "\n\n".join(passages)
+
+    full_text = "\n\n".join(l.content for l in lesson_index.lessons())
+    chunks = full_text.split('\n\n')
+    rng.shuffle(chunks)
+    return "\n\n".join(chunks)[:EXAM_SAMPLE_CHARS]
@@ -0,0 +1,196 @@
+import json
+import re
+
+# Define distinct rules and examples per difficulty
+# difficulty -> (difficulty_instruction, language_rules, example_options)
+DIFFICULTY_RULES = {
+    "Easy": (
+        "기본적인 단어와 간단한 문장 위주로 출제하세요.",
+        """
+        1. **질문**: 한국어로 작성하세요.
+        2. **보기**: 일본어 단어와 한국어 발음을 함께 적거나, 한국어로만 적으세요. (예: 食べる (타베루) 또는 타베루)
+        """,
+        '["타베루 (먹다)", "노무 (마시다)", "이쿠 (가다)", "쿠루 (오다)", "네루 (자다)"]',
+    ),
+    "Normal": (
+        "배운 내용을 충실히 복습할 수 있도록 적절한 난이도로 출제하세요.",
+        """
+        1. **질문**: 한국어로 작성하세요.
+        2. **보기**: **일본어(한자/히라가나)**와 **한국어 발음**을 함께 표기하세요. 
+           예: 食べる (타베루)
+        """,
+        '["食べる (타베루)", "飲む (노무)", "行く (이쿠)", "来る (쿠루)", "寝る (네루)"]',
+    ),
+    "Hard": (
+        "복잡한 문법, 반말/존댓말 구분, 미묘한 뉘앙스 차이를 물어보세요.",
+        """
+        1. **질문**: 한국어로 작성하세요.
+        2. **보기**: 반드시 **일본어(한자, 히라가나, 가타가나)**로만 작성하세요. 
+           **주의**: 절대 한글 발음(예: 타베루)을 적지 마세요. 오직 일본어 텍스트만 보여주세요.
+           예: 食べる (O), 食べる (타베루) (X)
+        """,
+        '["食べる", "飲みます", "行った", "来る", "寝ない"]',
+    ),
+    "Very Hard": (
+        "고급 어휘와 자연스러운 일본어 표현을 다루세요. (N2~N3 수준)",
+        """
+        1. **질문**: **일본어**로 작성하세요.
+        2. **보기**: 반드시 **일본어(한자, 히라가나, 가타가나)**로만 작성하세요.
+           **주의**: 절대 한글 발음이나 한국어 뜻을 적지 마세요.
+        """,
+        '["召し上がる", "参る", "伺う", "存じる", "申す"]',
+    ),
+}
+
+
+DIFFICULTIES = list(DIFFICULTY_RULES)
+
+# Rules shared by every difficulty (explanations, question design).
+QUIZ_RULES = """
+    * **해설(Explanation)**: 난이도와 상관없이 무조건 **한국어**로 설명하세요. 
+      단, 일본어 단어나 문장이 나올 경우 반드시 괄호 안에 한국어 발음과 뜻을 적어주세요. 
+
+    **기본 규칙:**
+    1. 문제는 5지 선다형(객관식)이어야 합니다.
+    2. 정답은 1개입니다.
+    3. 문제 유형을 다양하게 섞으세요 (한자 읽기, 한국어 뜻 맞추기, 문법 채우기, 뉘앙스 차이 등).
+
+    **중요한 출제 지침 (Critical):**
+    * **옵션 내용 필수**: `options` 배열에는 "A", "B", "C", "D", "E" 같은 기호를 절대 넣지 마세요. **반드시 실제 정답 텍스트**를 넣어야 합니다.
+    * **단순 암기 금지**: "어제 몇 시까지 근무했습니까?"와 같이 문서 내의 **구체적인 사실(Fact)**을 묻지 마세요.
+    * **응용 능력 평가**: 문서에 나온 **단어(Vocabulary)**와 **문법(Grammar)**을 활용하여, 새로운 문맥이나 일반적인 일본어 실력을 테스트하는 문제를 만드세요.
+    * **문맥 포함 필수**: "다음 문장의 괄호에 들어갈 말은?" 같은 질문을 낼 때는, **반드시 그 '문장'을 질문 내용에 포함해야 합니다.**
+      * 나쁜 예: "다음 괄호에 들어갈 조사는?" (문장이 없음)
+      * 좋은 예: "다음 문장의 괄호에 들어갈 조사는? 「私は学校(  )行きます。」"
+    * **문법적 정확성 (매우 중요)**: 
+      * 빈칸 앞의 단어가 이미 활용(Conjugation)된 상태인지 확인하세요.
+      * **절대** `終わった( て )` 처럼 [과거형 + 연결조사] 같은 비문법적인 문장을 만들지 마세요.
+      * 정답이 `て`라면, 앞 단어는 어간(Stem)이나 기본형이어야 합니다. (예: `終わっ( )`, `終わり( )`)
+      * 가장 안전한 방법은 **빈칸에 활용된 전체 단어를 넣는 것**입니다. (예: `仕事が( )家に帰りました。` 정답: `終わって`)
+"""
+
+JSON_RULES = """
+    **주의사항 (Critical JSON Rules):**
+    1. 반드시 **유효한 JSON** 형식이어야 합니다.
+    2. 문자열 내부에서 큰따옴표(")를 사용할 경우 반드시 **이스케이프(\\")** 처리하세요.
+    3. Trailing Comma (마지막 항목 뒤 쉼표)를 남기지 마세요.
+"""
+
+
+def build_quiz_instruction(difficulty):
+    """Static part of the quiz prompt: everything except the count and the notes."""
+    difficulty_instruction, language_rules, example_options = DIFFICULTY_RULES[difficulty]
+
+    return f"""
+    당신은 엄격하고 전문적인 일본어 학원 선생님입니다.
+    [수업 노트]를 바탕으로 복습용 5지 선다형 퀴즈를 만들어주세요.
+
+    난이도: {difficulty}
+    {difficulty_instruction}
+
+    **언어 규칙 (Language Rules) - 중요!:**
+    {language_rules}
+    {QUIZ_RULES}
+
+    **출력 형식 (JSON Array Only, No Markdown):**
+    [
+      {{
+        "question": "다음 중 올바른 표현은?",
+        "options": {example_options},
+        "answer_index": 0, 
+        "explanation": "'...'(설명)가 정답입니다.",
+        "type": "문법"
+      }}
+    ]
+    {JSON_RULES}
+    """
+
+
+def build_batch_quiz_instruction(difficulties=DIFFICULTIES):
+    """Like build_quiz_instruction, but one prompt covers several difficulties.
+
+    Each difficulty keeps its own instruction and language rules; the answer
+    is a JSON object mapping the difficulty name to its question array.
+    """
+    sections = []
+    for difficulty in difficulties:
+        difficulty_instruction, language_rules, example_options = DIFFICULTY_RULES[difficulty]
+        sections.append(f"""
+    ### 난이도: {difficulty}
+    {difficulty_instruction}
+
+    **언어 규칙 (Language Rules) - 중요!:**
+    {language_rules}
+    보기 예시: {example_options}
+""")
+
+    first = difficulties[0]
+    return f"""
+    당신은 엄격하고 전문적인 일본어 학원 선생님입니다.
+    [수업 노트]를 바탕으로 복습용 5지 선다형 퀴즈를 **난이도별로 따로** 만들어주세요.
+    각 난이도의 문제는 해당 난이도의 언어 규칙만 따라야 합니다. 난이도끼리 같은 문제를 반복하지 마세요.
+    {"".join(sections)}
+    {QUIZ_RULES}
+
+    **출력 형식 (JSON Object Only, No Markdown):**
+    난이도 이름({", ".join(difficulties)})을 키로, 그 난이도의 문제 배열을 값으로 하세요.
+    {{
+      "{first}": [
+        {{
+          "question": "다음 중 올바른 표현은?",
+          "options": {DIFFICULTY_RULES[first][2]},
+          "answer_index": 0, 
+          "explanation": "'...'(설명)가 정답입니다.",
+          "type": "문법"
+        }}
+      ],
+      ...
+    }}
+    {JSON_RULES}
+    """
+
+
+def build_quiz_request(count):
+    """Per-call part of the quiz prompt, sent alongside the (possibly cached) context."""
+    return f"위 [수업 노트]를 바탕으로 퀴즈를 {count}문제 만들어주세요. JSON Array만 출력하세요."
+
+
+def build_batch_quiz_request(count, difficulties=DIFFICULTIES):
+    return (f"위 [수업 노트]를 바탕으로 다음 난이도별로 각각 {count}문제씩 만들어주세요: "
+            f"{', '.join(difficulties)}. 난이도 이름을 키로 하는 JSON Object만 출력하세요.")
+
+
+def pack_lesson_notes(content):
+    return f"[수업 노트]:\n{content}"
+
+
+def parse_quiz_json(text):
+    """Parse a model response, tolerating markdown fences and trailing commas."""
+    if not text:
+        raise ValueError("Empty response from AI")
+
+    # Clean markdown if present
+    cleaned = text.replace("```json", "").replace("```", "").strip()
+
+    # Additional cleanup for common JSON errors
+    # Remove trailing commas in arrays/objects (simple regex approach)
+    cleaned = re.sub(r',\s*([\]}])', r'\1', cleaned)
+
+    if not cleaned:
+        raise ValueError("Empty JSON after cleaning")
+
+    return json.loads(cleaned)
+
+
+def split_quiz_batch(data, difficulties=DIFFICULTIES, required=None):
+    """``{difficulty: [question, ...]}`` from a batch response.
+
+    Difficulties the model skipped are left out; ``required`` (the one the
+    user asked for) must be present.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object keyed by difficulty")
+    batch = {d: data[d] for d in difficulties if isinstance(data.get(d), list) and data[d]}
+    if required is not None and required not in batch:
+        raise ValueError(f"No questions for {required}")
+    return batch
@@ -0,0 +1,242 @@
+import hashlib
+import re
+import threading
+from collections import Counter
+
+import numpy as np
+from scipy import sparse
+
+# Character n-grams work for mixed Korean/Japanese notes without a tokenizer.
+NGRAM_RANGE = (2, 3)
+PASSAGE_LINES = 6
+QUERY_LIMIT = 30
+# A question counts as mastered after this many correct answers in a row.
+# Lives here so weakness_queries and quiz_logic share it without an import cycle.
+MASTERY_THRESHOLD = 3
+
+_whitespace = re.compile(r'\s+')
+
+
+def _hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def char_ngrams(text, ngram_range=NGRAM_RANGE):
+    text = _whitespace.sub(' ', text.lower()).strip()
+    lo, hi = ngram_range
+    grams = []
+    for n in range(lo, hi + 1):
+        grams.extend(text[i:i + n] for i in range(len(text) - n + 1))
+    return grams
+
+
+def split_passages(content, max_lines=PASSAGE_LINES):
+    lines = [line for line in content.split('\n') if line.strip()]
+    return ['\n'.join(lines[i:i + max_lines]) for i in range(0, len(lines), max_lines)]
+
+
+def weakness_queries(history, limit=QUERY_LIMIT):
+    """Texts describing what the user struggles with, most recent first.
+
+    Wrong notes contribute question, correct option and explanation; questions
+    still below ``MASTERY_THRESHOLD`` contribute their text.
+    """
+    queries = []
+    seen = set()
+    for note in reversed(history.get('wrong_notes', [])):
+        parts = [note.get('question', '')]
+        options = note.get('options') or []
+        answer_index = note.get('answer_index')
+        if isinstance(answer_index, int) and 0 <= answer_index < len(options):
+            parts.append(str(options[answer_index]))
+        parts.append(note.get('explanation', ''))
+        seen.add(note.get('question'))
+        queries.append(' '.join(p for p in parts if p))
+
+    for question, count in reversed(list(history.get('mastery', {}).items())):
+        if count < MASTERY_THRESHOLD and question not in seen:
+            queries.append(question)
+
+    return queries[:limit]
+
+
+class PassageIndex:
+    """TF-IDF index over lesson passages from all documents.
+
+    Documents are registered with ``update_document``; unchanged documents
+    (same content hash) are skipped and only lessons not seen before are
+    vectorized, so a new lesson costs one lesson's worth of work. The stacked
+    matrix is rebuilt lazily on the next query.
+    """
+
+    def __init__(self, ngram_range=NGRAM_RANGE, passage_lines=PASSAGE_LINES):
+        self.ngram_range = ngram_range
+        self.passage_lines = passage_lines
+        self.vocab = {}
+        # doc_id -> {'hash': str, 'lessons': {lesson_hash: [(passage, cols, counts), ...]}}
+        self._docs = {}
+        self._matrix = None
+        self._passages = []
+        self._lock = threading.Lock()
+
+    def update_document(self, doc_id, contents, doc_hash=None):
+        """Index a document's lesson contents. Returns the number of lessons vectorized.
+
+        With ``doc_hash`` (any value that changes with the content) an
+        unchanged document is skipped before ``contents`` is iterated.
+
+        The lock is only held to give new n-grams vocabulary columns and to
+        swap the document in; reading, hashing, counting and building the
+        rows happen outside it, so a cold document doesn't stall other
+        sessions' queries. Columns are never reassigned, so rows built
+        against the vocabulary stay valid.
+        """
+        if doc_hash is None:
+            contents = list(contents)
+            doc_hash = _hash('\0'.join(contents))
+        doc = self._docs.get(doc_id)
+        if doc is not None and doc['hash'] == doc_hash:
+            return 0
+
+        known = doc['lessons'] if doc is not None else {}
+        keys = {}      # lesson hashes in document order
+        counted = {}   # lesson hash -> [(passage, Counter), ...] for new lessons
+        for content in contents:
+            key = _hash(content)
+            if key in keys:
+                continue
+            keys[key] = None
+            if key not in known:
+                counted[key] = [(passage, Counter(char_ngrams(passage, self.ngram_range)))
+                                for passage in split_passages(content, self.passage_lines)]
+
+        grams = set()
+        for passages in counted.values():
+            for _, counts in passages:
+                grams.update(counts)
+        with self._lock:
+            for gram in grams:
+                if gram not in self.vocab:
+                    self.vocab[gram] = len(self.vocab)
+        vectorized = {key: [self._vectorize_passage(passage, counts) for passage, counts in passages]
+                      for key, passages in counted.items()}
+
+        with self._lock:
+            # Another session may have indexed this document meanwhile.
+            doc = self._docs.get(doc_id)
+            if doc is not None and doc['hash'] == doc_hash:
+                return 0
+            old_lessons = doc['lessons'] if doc is not None else {}
+            lessons = {}
+            for key in keys:
+                if key in vectorized:
+                    lessons[key] = vectorized[key]
+                else:
+                    # Indexed when we looked; reuse those rows even if the
+                    # document has been replaced since.
+                    lessons[key] = old_lessons.get(key, known.get(key))
+            self._docs[doc_id] = {'hash': doc_hash, 'lessons': lessons}
+            self._matrix = None
+            return len(vectorized)
+
+    def remove_document(self, doc_id):
+        with self._lock:
+            if self._docs.pop(doc_id, None) is not None:
+                self._matrix = None
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(rows) for doc in self._docs.values() for rows in doc['lessons'].values())
+
+    def query(self, texts, top_k=20):
+        """Return ``[(score, doc_id, passage), ...]`` best first, scores > 0 only.
+
+        Each passage is scored by its best cosine similarity to any query.
+        ``top_k=None`` returns every matching passage.
+        """
+        texts = [t for t in texts if t]
+        with self._lock:
+            matrix, passages = self._stacked()
+            if matrix.shape[0] == 0 or not texts:
+                return []
+            queries = self._tfidf(self._vectorize_queries(texts), matrix.shape[1])
+
+        scores = (queries @ matrix.T).max(axis=0).toarray().ravel()
+        k = int(np.count_nonzero(scores))
+        if top_k is not None:
+            k = min(top_k, k)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]),) + passages[i] for i in top]
+
+    def select_passages(self, texts, max_chars):
+        """Most similar passages whose combined length fits ``max_chars``."""
+        selected = []
+        seen = set()
+        used = 0
+        for _, _, passage in self.query(texts, top_k=None):
+            if passage in seen or used + len(passage) > max_chars:
+                continue
+            seen.add(passage)
+            selected.append(passage)
+            used += len(passage) + 2
+        return selected
+
+    def _vectorize_passage(self, passage, counts):
+        vocab = self.vocab
+        cols = np.fromiter((vocab[g] for g in counts), dtype=np.int32, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        return passage, cols, values
+
+    def _vectorize_queries(self, texts):
+        indptr = [0]
+        cols = []
+        values = []
+        for text in texts:
+            counts = Counter(g for g in char_ngrams(text, self.ngram_range) if g in self.vocab)
+            cols.extend(self.vocab[g] for g in counts)
+            values.extend(counts.values())
+            indptr.append(len(cols))
+        return sparse.csr_matrix(
+            (np.asarray(values, dtype=np.float32), np.asarray(cols, dtype=np.int32), indptr),
+            shape=(len(texts), len(self.vocab)),
+        )
+
+    def _stacked(self):
+        if self._matrix is not None:
+            return self._matrix, self._passages
+
+        passages = []
+        col_parts = []
+        value_parts = []
+        indptr = [0]
+        for doc_id, doc in self._docs.items():
+            for rows in doc['lessons'].values():
+                for passage, cols, values in rows:
+                    passages.append((doc_id, passage))
+                    col_parts.append(cols)
+                    value_parts.append(values)
+                    indptr.append(indptr[-1] + len(cols))
+
+        n_cols = len(self.vocab)
+        counts = sparse.csr_matrix(
+            (np.concatenate(value_parts) if value_parts else np.zeros(0, np.float32),
+             np.concatenate(col_parts) if col_parts else np.zeros(0, np.int32),
+             indptr),
+            shape=(len(passages), n_cols),
+        )
+        df = np.bincount(counts.indices, minlength=n_cols)
+        self._idf = (np.log((1 + counts.shape[0]) / (1 + df)) + 1).astype(np.float32)
+        self._matrix = self._tfidf(counts, n_cols)
+        self._passages = passages
+        return self._matrix, self._passages
+
+    def _tfidf(self, counts, n_cols):
+        counts = counts.copy()
+        counts.resize((counts.shape[0], n_cols))
+        counts.data = np.log1p(counts.data) * self._idf[:n_cols][counts.indices]
+        norms = np.sqrt(counts.multiply(counts).sum(axis=1)).A.ravel()
+        norms[norms == 0] = 1
+        return sparse.diags(1 / norms) @ counts
@@ -5,6 +5,20 @@ import json
 import google.generativeai as genai
 import time
 import random
+import os
+
+from context_cache import GeminiContextCache, MIN_CACHE_CHARS
+from lessons import LessonIndex
+from local_corpus import ExportBuffer, LocalCorpus
+from quiz_prompts import (
+    DIFFICULTIES, build_batch_quiz_instruction, build_batch_quiz_request, build_quiz_instruction,
+    build_quiz_request, pack_lesson_notes, parse_quiz_json, split_quiz_batch,
+)
+from quiz_logic import (
+    MASTERY_THRESHOLD, build_exam_context, build_quiz_context, filter_unmastered,
+    new_history, record_answer, serialize_progress,
+)
+from retrieval import PassageIndex
 
 # Page Config
 st.set_page_config(page_title="일본어 복습 (Japanese Review)", page_icon="🇯🇵", layout="wide")
@@ -25,190 +39,135 @@ DOCS = {
     "2026년 2월": "1o3hJwHd0Le2rlYEk9g1ojqARiadDgDfnJvwXkosGThc"
 }
 
-# --- Logic: Parser ---
-def parse_doc(text):
-    lines = text.split('\n')
-    lessons = {}
-    current_date = None
-    current_content = []
-    
-    date_pattern = re.compile(r'^@\s*(\d{1,2}-\d{1,2})')
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-
-        match = date_pattern.match(line)
-        if match:
-            if current_date:
-                month = current_date.split('-')[0].zfill(2)
-                if month not in lessons:
-                    lessons[month] = []
-                lessons[month].append({
-                    'date': current_date,
-                    'content': '\n'.join(current_content).strip()
-                })
-            
-            current_date = match.group(1)
-            current_content = []
-        else:
-            if current_date:
-                current_content.append(line)
-
-    if current_date:
-        month = current_date.split('-')[0].zfill(2)
-        if month not in lessons:
-            lessons[month] = []
-        lessons[month].append({
-            'date': current_date,
-            'content': '\n'.join(current_content).strip()
-        })
-
-    return lessons
-
-@st.cache_data(ttl=3600)
-def fetch_and_parse(doc_id):
-    url = f"https://docs.google.com/document/d/{doc_id}/export?format=txt"
+# Overridable so the app can be pointed at a local export server (load tests).
+DOCS_EXPORT_URL = os.environ.get(
+    "DOCS_EXPORT_URL", "https://docs.google.com/document/d/{doc_id}/export?format=txt"
+)
+
+# Offline mode: read exported notebooks (*.txt) from this directory instead of Google Docs.
+LOCAL_CORPUS_DIR = os.environ.get("LOCAL_CORPUS_DIR")
+
+# --- Logic: Lessons ---
+@st.cache_resource(ttl=3600, show_spinner=False)
+def fetch_export(doc_id):
+    url = DOCS_EXPORT_URL.format(doc_id=doc_id)
     try:
         response = requests.get(url)
         response.raise_for_status()
-        return parse_doc(response.text)
+        return ExportBuffer(response.text, name=doc_id)
     except Exception as e:
         return None
 
+@st.cache_resource
+def get_local_corpus(root):
+    # Files are memory-mapped and only scanned for markers; lesson text is
+    # read the first time something asks for it.
+    return LocalCorpus(root)
+
+@st.cache_resource
+def get_lesson_index():
+    # Shared across sessions; a document is re-parsed only when its export
+    # (content hash, or size/mtime for local files) changes.
+    return LessonIndex()
+
+if LOCAL_CORPUS_DIR:
+    DOCS = {name: name for name in get_local_corpus(LOCAL_CORPUS_DIR).names()}
+
+def load_doc(name):
+    """Lessons of the named document (file order), or None if it can't be read."""
+    doc_id = DOCS[name]
+    if LOCAL_CORPUS_DIR:
+        # Stats the file on every call, so a re-exported notebook comes back
+        # as a new export with a new (size, mtime) signature and is re-indexed.
+        export = get_local_corpus(LOCAL_CORPUS_DIR).export(doc_id)
+    else:
+        export = fetch_export(doc_id)
+    if export is None:
+        # Deleted file: its lessons would point at a closed map.
+        get_lesson_index().remove_document(doc_id)
+        get_passage_index().remove_document(doc_id)
+        return None
+
+    index = get_lesson_index()
+    index.update_document(doc_id, export, name=name)
+    return index.lessons(doc_id)
+
+def load_all_docs():
+    """Make sure every document is indexed and return the shared lesson index."""
+    for name in DOCS:
+        load_doc(name)
+    return get_lesson_index()
+
+@st.cache_resource
+def get_passage_index():
+    # Shared across sessions; a document is only re-vectorized when its
+    # content hash changes, and then only for lessons not seen before.
+    return PassageIndex()
+
 # --- Logic: AI (Gemini) ---
-def generate_quiz(content, difficulty, count=10):
-    try:
-        api_key = st.secrets["GOOGLE_API_KEY"]
-    except KeyError:
-        st.error("GOOGLE_API_KEY가 설정되지 않았습니다 (.streamlit/secrets.toml).")
-        return []
+MODEL_NAME = 'gemini-2.5-flash-lite'
 
-    genai.configure(api_key=api_key)
-    
-    # Using latest Flash-Lite as requested
-    model = genai.GenerativeModel('gemini-2.5-flash-lite')
-    
-    # Define distinct rules and examples per difficulty
-    if difficulty == "Easy":
-        difficulty_instruction = "기본적인 단어와 간단한 문장 위주로 출제하세요."
-        language_rules = """
-        1. **질문**: 한국어로 작성하세요.
-        2. **보기**: 일본어 단어와 한국어 발음을 함께 적거나, 한국어로만 적으세요. (예: 食べる (타베루) 또는 타베루)
-        """
-        example_options = '["타베루 (먹다)", "노무 (마시다)", "이쿠 (가다)", "쿠루 (오다)", "네루 (자다)"]'
-        
-    elif difficulty == "Normal":
-        difficulty_instruction = "배운 내용을 충실히 복습할 수 있도록 적절한 난이도로 출제하세요."
-        language_rules = """
-        1. **질문**: 한국어로 작성하세요.
-        2. **보기**: **일본어(한자/히라가나)**와 **한국어 발음**을 함께 표기하세요. 
-           예: 食べる (타베루)
-        """
-        example_options = '["食べる (타베루)", "飲む (노무)", "行く (이쿠)", "来る (쿠루)", "寝る (네루)"]'
-
-    elif difficulty == "Hard":
-        difficulty_instruction = "복잡한 문법, 반말/존댓말 구분, 미묘한 뉘앙스 차이를 물어보세요."
-        language_rules = """
-        1. **질문**: 한국어로 작성하세요.
-        2. **보기**: 반드시 **일본어(한자, 히라가나, 가타가나)**로만 작성하세요. 
-           **주의**: 절대 한글 발음(예: 타베루)을 적지 마세요. 오직 일본어 텍스트만 보여주세요.
-           예: 食べる (O), 食べる (타베루) (X)
-        """
-        example_options = '["食べる", "飲みます", "行った", "来る", "寝ない"]'
-
-    elif difficulty == "Very Hard":
-        difficulty_instruction = "고급 어휘와 자연스러운 일본어 표현을 다루세요. (N2~N3 수준)"
-        language_rules = """
-        1. **질문**: **일본어**로 작성하세요.
-        2. **보기**: 반드시 **일본어(한자, 히라가나, 가타가나)**로만 작성하세요.
-           **주의**: 절대 한글 발음이나 한국어 뜻을 적지 마세요.
-        """
-        example_options = '["召し上がる", "参る", "伺う", "存じる", "申す"]'
+# Safety Settings to prevent blocking
+SAFETY_SETTINGS = [
+    {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
+    {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
+]
 
-    prompt = f"""
-    당신은 엄격하고 전문적인 일본어 학원 선생님입니다.
-    아래의 [수업 노트]를 바탕으로 복습용 5지 선다형 퀴즈를 {{count}}문제 만들어주세요.
+@st.cache_resource
+def get_context_cache():
+    # Shared across sessions: entries are keyed by document and difficulty, and
+    # bound to the content hash, so users reviewing the same notes share them.
+    return GeminiContextCache(MODEL_NAME)
 
-    난이도: {{difficulty}}
-    {{difficulty_instruction}}
 
-    **언어 규칙 (Language Rules) - 중요!:**
-    {{language_rules}}
-    
-    * **해설(Explanation)**: 난이도와 상관없이 무조건 **한국어**로 설명하세요. 
-      단, 일본어 단어나 문장이 나올 경우 반드시 괄호 안에 한국어 발음과 뜻을 적어주세요. 
-
-    **기본 규칙:**
-    1. 문제는 5지 선다형(객관식)이어야 합니다.
-    2. 정답은 1개입니다.
-    3. 문제 유형을 다양하게 섞으세요 (한자 읽기, 한국어 뜻 맞추기, 문법 채우기, 뉘앙스 차이 등).
-
-    **중요한 출제 지침 (Critical):**
-    * **옵션 내용 필수**: `options` 배열에는 "A", "B", "C", "D", "E" 같은 기호를 절대 넣지 마세요. **반드시 실제 정답 텍스트**를 넣어야 합니다.
-    * **단순 암기 금지**: "어제 몇 시까지 근무했습니까?"와 같이 문서 내의 **구체적인 사실(Fact)**을 묻지 마세요.
-    * **응용 능력 평가**: 문서에 나온 **단어(Vocabulary)**와 **문법(Grammar)**을 활용하여, 새로운 문맥이나 일반적인 일본어 실력을 테스트하는 문제를 만드세요.
-    * **문맥 포함 필수**: "다음 문장의 괄호에 들어갈 말은?" 같은 질문을 낼 때는, **반드시 그 '문장'을 질문 내용에 포함해야 합니다.**
-      * 나쁜 예: "다음 괄호에 들어갈 조사는?" (문장이 없음)
-      * 좋은 예: "다음 문장의 괄호에 들어갈 조사는? 「私は学校(  )行きます。」"
-    * **문법적 정확성 (매우 중요)**: 
-      * 빈칸 앞의 단어가 이미 활용(Conjugation)된 상태인지 확인하세요.
-      * **절대** `終わった( て )` 처럼 [과거형 + 연결조사] 같은 비문법적인 문장을 만들지 마세요.
-      * 정답이 `て`라면, 앞 단어는 어간(Stem)이나 기본형이어야 합니다. (예: `終わっ( )`, `終わり( )`)
-      * 가장 안전한 방법은 **빈칸에 활용된 전체 단어를 넣는 것**입니다. (예: `仕事が( )家に帰りました。` 정답: `終わって`)
-
-
-    **출력 형식 (JSON Array Only, No Markdown):**
-    [
-      {{
-        "question": "다음 중 올바른 표현은?",
-        "options": {{example_options}},
-        "answer_index": 0, 
-        "explanation": "'...'(설명)가 정답입니다.",
-        "type": "문법"
-      }}
-    ]
+def request_quiz_text(instruction, content, request, cache_key=None):
+    notes = pack_lesson_notes(content)
 
-    **주의사항 (Critical JSON Rules):**
-    1. 반드시 **유효한 JSON** 형식이어야 합니다.
-    2. 문자열 내부에서 큰따옴표(")를 사용할 경우 반드시 **이스케이프(\")** 처리하세요.
-    3. Trailing Comma (마지막 항목 뒤 쉼표)를 남기지 마세요.
+    if cache_key is not None and len(notes) >= MIN_CACHE_CHARS:
+        cache = get_context_cache()
+        try:
+            entry = cache.get_or_register(cache_key, instruction, notes)
+        except Exception as e:
+            # Registration failed (e.g. notes under the model's minimum); send inline.
+            print(f"Context cache unavailable for {cache_key}: {e}")
+            entry = None
+        if entry is not None:
+            try:
+                return cache.generate(entry, request, safety_settings=SAFETY_SETTINGS)
+            except Exception as e:
+                # Only a context that is gone is dropped and retried inline (the
+                # next call registers a fresh one). Rate limits and server
+                # errors go to request_quiz_json's retry loop instead of being
+                # answered with the largest possible request.
+                if not cache.is_missing(e):
+                    raise
+                print(f"Cached context for {cache_key} is gone: {e}")
+                cache.invalidate(cache_key)
+
+    model = genai.GenerativeModel(MODEL_NAME)
+    prompt = f"{instruction}\n\n{notes}\n\n{request}"
+    return model.generate_content(prompt, safety_settings=SAFETY_SETTINGS).text
+
+
+def request_quiz_json(instruction, content, request, cache_key=None, parse=parse_quiz_json):
+    """Ask for a quiz and parse it, retrying up to 3 times. Returns None on failure."""
+    try:
+        api_key = st.secrets["GOOGLE_API_KEY"]
+    except KeyError:
+        st.error("GOOGLE_API_KEY가 설정되지 않았습니다 (.streamlit/secrets.toml).")
+        return None
 
-    [수업 노트]:
-    {{content}}
-    """
+    genai.configure(api_key=api_key)
 
     retry_count = 0
     max_retries = 3
-    
-    # Safety Settings to prevent blocking
-    safety_settings = [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-    ]
 
     while retry_count < max_retries:
         try:
-            response = model.generate_content(prompt, safety_settings=safety_settings)
-            text = response.text
-            
-            if not text:
-                raise ValueError("Empty response from AI")
-
-            # Clean markdown if present
-            cleaned = text.replace("```json", "").replace("```", "").strip()
-            
-            # Additional cleanup for common JSON errors
-            # Remove trailing commas in arrays/objects (simple regex approach)
-            cleaned = re.sub(r',\s*([\]}])', r'\1', cleaned)
-            
-            if not cleaned:
-                 raise ValueError("Empty JSON after cleaning")
-
-            return json.loads(cleaned)
+            text = request_quiz_text(instruction, content, request, cache_key=cache_key)
+            return parse(text)
             
         except Exception as e:
             retry_count += 1
@@ -218,19 +177,87 @@ def generate_quiz(content, difficulty, count=10):
                 # Show raw output for debugging if needed (hidden in expander)
                 with st.expander("AI 원본 응답 보기 (디버깅용)"):
                     st.code(text if 'text' in locals() else "No response")
-                return []
+                return None
             time.sleep(1) # Wait a bit before retrying
 
+
+def generate_quiz(content, difficulty, count=10, cache_key=None):
+    instruction = build_quiz_instruction(difficulty)
+    request = build_quiz_request(count)
+    if cache_key is not None:
+        cache_key = (cache_key, difficulty)
+
+    questions = request_quiz_json(instruction, content, request, cache_key=cache_key)
+    return questions if questions is not None else []
+
+
+def generate_quiz_batch(content, difficulty, count=10, cache_key=None):
+    """Questions for every difficulty from one request over ``content``.
+
+    Returns ``{difficulty: questions}`` with the requested difficulty always
+    present (or ``{}`` on failure); the others may be missing if the model
+    skipped them.
+    """
+    # Same instruction whatever the requested difficulty, so one cached context serves all.
+    instruction = build_batch_quiz_instruction(DIFFICULTIES)
+    request = build_batch_quiz_request(count, DIFFICULTIES)
+    if cache_key is not None:
+        cache_key = (cache_key, 'batch')
+
+    batch = request_quiz_json(
+        instruction, content, request, cache_key=cache_key,
+        parse=lambda text: split_quiz_batch(parse_quiz_json(text), DIFFICULTIES, required=difficulty),
+    )
+    return batch or {}
+
+
+# Extra questions from batched generation, per session:
+# (doc_id, export signature, difficulty) -> questions. Each set is used once.
+# The signature comes from the lesson index, so checking the bank never
+# reads or hashes the notes themselves.
+def get_quiz_bank():
+    if 'quiz_bank' not in st.session_state:
+        st.session_state.quiz_bank = {}
+    return st.session_state.quiz_bank
+
+
+def store_quiz_batch(doc_id, signature, batch):
+    bank = get_quiz_bank()
+    # Sets generated from an older version of the notes are dropped.
+    for key in [k for k in bank if k[0] == doc_id and k[1] != signature]:
+        del bank[key]
+    for difficulty, questions in batch.items():
+        bank[(doc_id, signature, difficulty)] = questions
+
+
+def has_banked_quiz(doc_id, difficulty):
+    return (doc_id, get_lesson_index().signature(doc_id), difficulty) in get_quiz_bank()
+
+
+def get_doc_quiz(doc_id, lessons, difficulty, count, batch=False):
+    """Questions for a document review: a banked set from an earlier batch if
+    one exists, otherwise a new request (batched when ``batch`` is set).
+    """
+    signature = get_lesson_index().signature(doc_id)
+    questions = get_quiz_bank().pop((doc_id, signature, difficulty), None)
+    if questions:
+        return questions
+
+    content = build_quiz_context(lessons)
+    if not batch:
+        return generate_quiz(content, difficulty, count=count, cache_key=doc_id)
+
+    generated = generate_quiz_batch(content, difficulty, count=count, cache_key=doc_id)
+    questions = generated.pop(difficulty, [])
+    store_quiz_batch(doc_id, signature, generated)
+    return questions
+
 # ... (Imports are unchanged at the top, just replacing from line 173 onwards ideally, but I will do a larger chunk to restructure)
 
 # --- Logic: Persistence & Stats ---
 def get_current_stats():
     if 'history' not in st.session_state:
-        st.session_state.history = {
-            'mastery': {},  # "question_text": correct_count (int)
-            'wrong_notes': [],  # List of {question, options, answer_index, explanation, your_answer}
-            'vocab_list': []    # List of {word, meaning, pronunciation}
-        }
+        st.session_state.history = new_history()
     # Ensure vocab_list exists for backward compatibility
     if 'vocab_list' not in st.session_state.history:
         st.session_state.history['vocab_list'] = []
@@ -239,7 +266,7 @@ def get_current_stats():
 
 def save_progress():
     history = get_current_stats()
-    return json.dumps(history, ensure_ascii=False, indent=2)
+    return serialize_progress(history)
 
 def process_uploaded_file():
     """Callback for file uploader"""
@@ -252,7 +279,7 @@ def process_uploaded_file():
                 st.session_state.history = data
                 
                 # Feedback stats
-                m_count = sum(1 for v in data.get('mastery', {}).values() if v >= 3)
+                m_count = sum(1 for v in data.get('mastery', {}).values() if v >= MASTERY_THRESHOLD)
                 v_count = len(data.get('vocab_list', []))
                 
                 # We can't use st.success here easily as it clears on rerun, but toast works
@@ -274,9 +301,13 @@ with st.sidebar:
     
     difficulty = st.select_slider(
         "난이도 (Difficulty)",
-        options=["Easy", "Normal", "Hard", "Very Hard"],
+        options=DIFFICULTIES,
         value="Normal"
     )
+    batch_generation = st.toggle(
+        "모든 난이도 한 번에 생성",
+        help="교재 복습 시 4개 난이도 문제를 한 번의 요청으로 만들어 두고, 난이도를 바꾸면 바로 출제합니다.",
+    )
     
     st.divider()
     
@@ -284,7 +315,7 @@ with st.sidebar:
     
     # Init stats
     stats = get_current_stats()
-    mastered_count = sum(1 for v in stats['mastery'].values() if v >= 3)
+    mastered_count = sum(1 for v in stats['mastery'].values() if v >= MASTERY_THRESHOLD)
     wrong_count = len(stats['wrong_notes'])
     
     st.caption(f"🏆 마스터한 문제: {mastered_count}개")
@@ -313,11 +344,20 @@ with st.sidebar:
     
     if st.button("캐시 삭제 (새로고침)"):
         st.cache_data.clear()
+        get_context_cache().clear()
+        fetch_export.clear()
+        get_local_corpus.clear()
+        get_lesson_index.clear()
+        get_quiz_bank().clear()
         st.rerun()
 
 # --- UI: Main Content ---
 st.title("🇯🇵 일본어 완벽 복습")
 
+if not DOCS:
+    st.error(f"교재 파일(*.txt)을 찾을 수 없습니다: {LOCAL_CORPUS_DIR}")
+    st.stop()
+
 if "GOOGLE_API_KEY" not in st.secrets:
     st.warning("⚠️ `.streamlit/secrets.toml` 파일에 `GOOGLE_API_KEY`를 설정해주세요.")
     st.stop()
@@ -339,12 +379,7 @@ def start_quiz(questions, mode='quiz'):
     # Filter mastered questions if in normal quiz mode
     if mode == 'quiz':
         history = get_current_stats()
-        filtered_questions = []
-        for q in questions:
-            q_text = q['question']
-            # If mastered (>= 3 correct), skip
-            if history['mastery'].get(q_text, 0) < 3:
-                filtered_questions.append(q)
+        filtered_questions = filter_unmastered(questions, history['mastery'])
         
         if len(filtered_questions) < len(questions):
             st.toast(f"마스터한 {len(questions) - len(filtered_questions)}문제를 건너뛰었습니다! 😎")
@@ -378,36 +413,11 @@ def submit_answer():
     
     if is_correct:
         qs['score'] += 1
-        # Update Mastery (Only in normal quiz mode)
-        if qs['mode'] == 'quiz':
-            current_mastery = history['mastery'].get(q['question'], 0)
-            history['mastery'][q['question']] = current_mastery + 1
-            if history['mastery'][q['question']] == 3:
-                 st.toast("🎉 축하합니다! 이 문제를 마스터했습니다! (3번 연속 정답)", icon="🏆")
-        
-        # If answering correctly in wrong note mode, maybe remove it?
-        # User requested "view wrong notes", not necessarily "remove logic".
-        # Let's keep it simple: Wrong notes are a collection.
-        # Optional: Remove from wrong notes if answered correctly? 
-        # For now, let's keep them until manually cleared or just append.
-        # Actually better UX: If I get it right in Wrong Note mode, I probably explicitly want to clear it?
-        # Let's add a "Delete from note" button instead of auto-delete.
-        
-    else:
-        # Incorrect behavior
-        # Reset Mastery streak? Or decrement?
-        # Usually stricter is reset to 0.
-        if qs['mode'] == 'quiz':
-            history['mastery'][q['question']] = 0
-            
-            # Add to Wrong Notes if not already present
-            # distinct by question text
-            exists = any(wn['question'] == q['question'] for wn in history['wrong_notes'])
-            if not exists:
-                # Store full question object + my wrong answer (optional)
-                note_entry = q.copy()
-                # note_entry['failed_at'] = ...
-                history['wrong_notes'].append(note_entry)
+
+    # Update Mastery / Wrong Notes (only in normal quiz mode)
+    mastery = record_answer(history, q, is_correct, qs['mode'])
+    if is_correct and mastery == MASTERY_THRESHOLD:
+         st.toast("🎉 축하합니다! 이 문제를 마스터했습니다! (3번 연속 정답)", icon="🏆")
 
 def next_question():
     qs = st.session_state.quiz_state
@@ -431,7 +441,7 @@ def extract_vocabulary(text):
         return []
         
     genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-2.5-flash-lite')
+    model = genai.GenerativeModel(MODEL_NAME)
     
     prompt = f"""
     당신은 일본어 선생님입니다. 
@@ -464,18 +474,10 @@ def extract_vocabulary(text):
     MAX_RETRIES = 3
     retry_count = 0
     
-    # Safety Settings
-    safety_settings = [
-        {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_HATE_SPEECH", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_SEXUALLY_EXPLICIT", "threshold": "BLOCK_NONE"},
-        {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
-    ]
-    
     while retry_count < MAX_RETRIES:
         try:
             # Limit text length to avoid token limits for vocabulary extraction context
-            response = model.generate_content(prompt, safety_settings=safety_settings)
+            response = model.generate_content(prompt, safety_settings=SAFETY_SETTINGS)
             text_resp = response.text
             
             if not text_resp:
@@ -577,29 +579,24 @@ with tab1:
         # DASHBOARD VIEW
         st.subheader(f"📖 선택된 교재: {selected_doc_name}")
         
-        data = fetch_and_parse(DOCS[selected_doc_name])
+        lessons = load_doc(selected_doc_name)
         
-        if data:
+        if lessons:
             # Calculate stats
-            total_days = sum(len(lessons) for lessons in data.values())
+            total_days = len(lessons)
             
             col1, col2 = st.columns([3, 1])
             with col1:
                  st.write(f"총 **{total_days}일치**의 수업 내용이 있습니다.")
             with col2:
+                 if has_banked_quiz(DOCS[selected_doc_name], difficulty):
+                     st.caption(f"⚡ {difficulty} 문제가 준비되어 있습니다.")
                  if st.button(f"'{selected_doc_name}' 전체 복습하기", type="primary", use_container_width=True):
                      with st.spinner("AI가 문제를 출제하고 있습니다..."):
-                        all_content = []
-                        for m in data:
-                            for l in data[m]:
-                                all_content.append(l['content'])
-                        
-                        full_text = "\n\n".join(all_content)
-                        if len(full_text) > 30000:
-                            full_text = full_text[:30000]
-                            
                         # Request slightly more questions to account for filtering
-                        questions = generate_quiz(full_text, difficulty, count=15)
+                        questions = get_doc_quiz(
+                            DOCS[selected_doc_name], lessons, difficulty, count=15, batch=batch_generation
+                        )
                         if questions:
                             start_quiz(questions, mode='quiz')
                             st.rerun()
@@ -614,21 +611,12 @@ with tab1:
         
         if st.button("종합 평가 시작하기", type="secondary"):
              with st.spinner("모든 교재를 분석 중입니다..."):
-                all_content = []
+                lesson_index = load_all_docs()
+                sample_text = build_exam_context(
+                    lesson_index, get_passage_index(), DOCS.values(), get_current_stats()
+                )
                 
-                for name, doc_id in DOCS.items():
-                    d = fetch_and_parse(doc_id)
-                    if d:
-                        for m in d:
-                            for l in d[m]:
-                                 all_content.append(l['content'])
-                
-                if all_content:
-                    full_text = "\n\n".join(all_content)
-                    chunks = full_text.split('\n\n')
-                    random.shuffle(chunks)
-                    sample_text = "\n\n".join(chunks)[:35000]
-                    
+                if sample_text:
                     questions = generate_quiz(sample_text, difficulty, count=15)
                     if questions:
                         start_quiz(questions, mode='quiz')
@@ -684,30 +672,19 @@ with tab3:
     col_v1, col_v2 = st.columns([3, 1])
     
     with col_v1:
-        target_scope = st.radio("추출 대상", ["현재 선택된 교재", "모든 교재 (오래 걸림)"], horizontal=True)
+        target_scope = st.radio("추출 대상", ["현재 선택된 교재", "최근 4주", "모든 교재 (오래 걸림)"], horizontal=True)
     
     with col_v2: 
         if st.button("단어장 생성", type="primary"):
             with st.spinner("단어를 추출하고 있습니다..."):
-                source_text = ""
                 if target_scope == "현재 선택된 교재":
-                    d = fetch_and_parse(DOCS[selected_doc_name])
-                    if d:
-                        all_c = []
-                        for m in d:
-                            for l in d[m]:
-                                all_c.append(l['content'])
-                        source_text = "\\n".join(all_c)
+                    lessons = load_doc(selected_doc_name) or []
+                elif target_scope == "최근 4주":
+                    lessons = load_all_docs().period("last 4 weeks")
                 else:
-                    # All docs
-                    all_c = []
-                    for k, v in DOCS.items():
-                        d = fetch_and_parse(v)
-                        if d:
-                             for m in d:
-                                for l in d[m]:
-                                    all_c.append(l['content'])
-                    source_text = "\\n".join(all_c)
+                    # All docs, by date
+                    lessons = load_all_docs().lessons()
+                source_text = "\n".join(l.content for l in lessons)
                 
                 if source_text:
                     vocab_list = extract_vocabulary(source_text)
@@ -0,0 +1,177 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from context_cache import EXPIRY_MARGIN_SECONDS, ContextCache, LocalContextCache
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def echo(system_instruction, content, prompt):
+    return f"{content}|{prompt}"
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return LocalContextCache(echo, ttl_seconds=600, clock=clock)
+
+
+def test_repeat_lookup_is_a_hit(cache):
+    first = cache.get_or_register(('doc', 'Normal'), 'rules', 'notes')
+    second = cache.get_or_register(('doc', 'Normal'), 'rules', 'notes')
+
+    assert second is first
+    assert cache.stats == {'hits': 1, 'misses': 1, 'invalidations': 0, 'expired': 0}
+    # Uploaded once; the second lookup sent nothing.
+    assert cache.sent_chars == len('rules') + len('notes')
+    assert cache.generate(second, 'q') == 'notes|q'
+
+
+def test_keys_are_independent(cache):
+    cache.get_or_register(('doc', 'Easy'), 'rules', 'notes')
+    cache.get_or_register(('doc', 'Hard'), 'rules', 'notes')
+
+    assert cache.stats['misses'] == 2
+    assert len(cache) == 2
+
+
+def test_content_change_invalidates_and_deletes(cache):
+    old = cache.get_or_register('doc', 'rules', 'notes v1')
+    new = cache.get_or_register('doc', 'rules', 'notes v2')
+
+    assert new is not old
+    assert cache.stats['invalidations'] == 1
+    assert cache.stats['misses'] == 2
+    assert cache.deleted == 1
+    assert cache.generate(new, 'q') == 'notes v2|q'
+
+
+def test_instruction_change_invalidates(cache):
+    cache.get_or_register('doc', 'rules v1', 'notes')
+    cache.get_or_register('doc', 'rules v2', 'notes')
+
+    assert cache.stats['invalidations'] == 1
+    assert cache.deleted == 1
+
+
+def test_entry_expires_before_the_server_ttl(cache, clock):
+    cache.get_or_register('doc', 'rules', 'notes')
+
+    clock.now += 600 - EXPIRY_MARGIN_SECONDS - 1
+    cache.get_or_register('doc', 'rules', 'notes')
+    assert cache.stats['hits'] == 1
+
+    clock.now += 1
+    entry = cache.get_or_register('doc', 'rules', 'notes')
+    assert cache.stats['expired'] == 1
+    assert cache.stats['misses'] == 2
+    assert cache.deleted == 1
+    assert entry.expires_at == clock.now + 600
+
+
+def test_invalidate_and_clear_delete_contexts(cache):
+    cache.get_or_register('a', 'rules', 'notes')
+    cache.get_or_register('b', 'rules', 'notes')
+
+    cache.invalidate('a')
+    cache.invalidate('missing')
+    assert cache.deleted == 1
+
+    cache.clear()
+    assert cache.deleted == 2
+    assert len(cache) == 0
+
+
+def test_generate_errors_are_not_cache_misses_by_default(cache):
+    assert not cache.is_missing(RuntimeError("429 Resource exhausted"))
+
+
+def test_concurrent_lookups_register_once(clock):
+    class SlowCache(LocalContextCache):
+        def _create(self, key, system_instruction, content):
+            time.sleep(0.05)
+            return super()._create(key, system_instruction, content)
+
+    cache = SlowCache(echo, clock=clock)
+    entries = []
+    threads = [
+        threading.Thread(target=lambda: entries.append(cache.get_or_register('doc', 'rules', 'notes')))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.stats['misses'] == 1
+    assert cache.stats['hits'] == 4
+    assert all(entry is entries[0] for entry in entries)
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        ContextCache()
+
+
+def test_lookup_during_registration_deletes_what_it_replaces(clock):
+    creating = threading.Event()
+    release = threading.Event()
+
+    class BlockingCache(LocalContextCache):
+        def _create(self, key, system_instruction, content):
+            if content == 'notes v1':
+                creating.set()
+                release.wait()
+            return super()._create(key, system_instruction, content)
+
+    cache = BlockingCache(echo, clock=clock)
+    first = threading.Thread(target=cache.get_or_register, args=('doc', 'rules', 'notes v1'))
+    first.start()
+    creating.wait()
+
+    second = threading.Thread(target=cache.get_or_register, args=('doc', 'rules', 'notes v2'))
+    second.start()
+    time.sleep(0.05)
+    release.set()
+    first.join()
+    second.join()
+
+    # v2 waited for v1's registration, then replaced it and deleted it.
+    assert cache.stats['invalidations'] == 1
+    assert cache.deleted == 1
+    assert len(cache) == 1
+
+
+def test_every_replaced_context_is_deleted():
+    # Many short rounds with frequent thread switches, so lookups for the
+    # other version land between a registration's steps.
+    def churn(cache, i):
+        for j in range(20):
+            cache.get_or_register('doc', 'rules', f"notes v{(i + j) % 2}")
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        for _ in range(100):
+            cache = LocalContextCache(echo)
+            threads = [threading.Thread(target=churn, args=(cache, i)) for i in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert cache.deleted == cache.stats['invalidations'] + cache.stats['expired']
+    finally:
+        sys.setswitchinterval(interval)
@@ -0,0 +1,113 @@
+import datetime
+
+import pytest
+
+from lessons import LessonIndex, doc_year_month, lesson_date, parse_doc, parse_period
+from local_corpus import ExportBuffer
+
+D = datetime.date
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('2025년 3월', (2025, 3)),
+    ('2025/03', (2025, 3)),
+    ('2025-12 notes', (2025, 12)),
+    ('2025 archive', (2025, None)),
+    ('2025/13', (2025, None)),
+    ('notes', (None, None)),
+    (None, (None, None)),
+])
+def test_doc_year_month(name, expected):
+    assert doc_year_month(name) == expected
+
+
+@pytest.mark.parametrize('marker, doc_month, expected', [
+    ('03-04', 3, D(2025, 3, 4)),
+    ('03-04', None, D(2025, 3, 4)),
+    # Within six months of the document's month: same year.
+    ('06-30', 12, D(2025, 6, 30)),
+    ('09-01', 3, D(2025, 9, 1)),
+    # Further away: the lesson belongs to the neighbouring year.
+    ('01-05', 12, D(2026, 1, 5)),
+    ('12-20', 1, D(2024, 12, 20)),
+    ('05-31', 12, D(2026, 5, 31)),
+    # Days are clamped to the month.
+    ('02-30', 2, D(2025, 2, 28)),
+    ('04-00', 4, D(2025, 4, 1)),
+])
+def test_lesson_date(marker, doc_month, expected):
+    assert lesson_date(marker, 2025, doc_month) == expected
+
+
+def test_lesson_date_rejects_impossible_months():
+    assert lesson_date('13-01', 2025, 3) is None
+    assert lesson_date('00-10', 2025, 3) is None
+
+
+def test_impossible_marker_keeps_its_notes():
+    lessons = parse_doc("@ 13-01\n序文\n@ 03-04\n食べる\n@ 31-04\n飲む\n", doc_id='d', name='2025/03')
+
+    assert [(l.date, l.content) for l in lessons] == [
+        (D(2025, 3, 1), '序文'),
+        (D(2025, 3, 4), '食べる'),
+        (D(2025, 3, 4), '飲む'),
+    ]
+    assert [l.id for l in lessons] == ['d/2025-03-01', 'd/2025-03-04', 'd/2025-03-04#2']
+
+
+@pytest.mark.parametrize('spec, expected', [
+    ('2025-03..2025-06', (D(2025, 3, 1), D(2025, 6, 30))),
+    ('2024-02..2024-02', (D(2024, 2, 1), D(2024, 2, 29))),
+    ('2025-03-10..2025-03-20', (D(2025, 3, 10), D(2025, 3, 20))),
+    (' 2025-03-10 .. 2025-04 ', (D(2025, 3, 10), D(2025, 4, 30))),
+    ('last 4 weeks', (D(2025, 5, 4), D(2025, 5, 31))),
+    ('Last 1 week', (D(2025, 5, 25), D(2025, 5, 31))),
+    ('last 10 days', (D(2025, 5, 22), D(2025, 5, 31))),
+])
+def test_parse_period(spec, expected):
+    assert parse_period(spec, today=D(2025, 5, 31)) == expected
+
+
+@pytest.mark.parametrize('spec', ['', 'march', '2025-03', 'last weeks', 'last 2 months'])
+def test_parse_period_rejects_unknown_specs(spec):
+    with pytest.raises(ValueError):
+        parse_period(spec, today=D(2025, 5, 31))
+
+
+@pytest.fixture
+def index():
+    index = LessonIndex()
+    index.update_document('2025/03', ExportBuffer("@ 03-04\na\n@ 03-11\nb\n@ 03-11\nc\n"), name='2025/03')
+    index.update_document('2025/04', ExportBuffer("@ 04-01\nd\n@ 04-15\ne\n"), name='2025/04')
+    return index
+
+
+def dates(lessons):
+    return [l.date for l in lessons]
+
+
+def test_range_bounds_are_inclusive(index):
+    assert dates(index.range(D(2025, 3, 11), D(2025, 4, 1))) == [
+        D(2025, 3, 11), D(2025, 3, 11), D(2025, 4, 1),
+    ]
+    assert dates(index.range(end=D(2025, 3, 10))) == [D(2025, 3, 4)]
+    assert dates(index.range(start=D(2025, 4, 2))) == [D(2025, 4, 15)]
+    assert len(index.range()) == len(index) == 5
+    assert index.range(D(2025, 5, 1), D(2025, 5, 31)) == []
+
+
+def test_period_counts_back_from_the_newest_lesson(index):
+    assert dates(index.period('last 6 weeks')) == [
+        D(2025, 3, 11), D(2025, 3, 11), D(2025, 4, 1), D(2025, 4, 15),
+    ]
+    assert index.latest().content == 'e'
+    assert LessonIndex().period('last 4 weeks') == []
+
+
+def test_update_document_replaces_only_on_new_signature(index):
+    export = ExportBuffer("@ 04-01\nd\n@ 04-15\ne\n")
+    assert not index.update_document('2025/04', export, name='2025/04')
+
+    assert index.update_document('2025/04', ExportBuffer("@ 04-22\nf\n"), name='2025/04')
+    assert dates(index.lessons('2025/04')) == [D(2025, 4, 22)]
+    assert len(index) == 4
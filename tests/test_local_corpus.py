@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+from lessons import LessonIndex
+from local_corpus import LocalCorpus
+
+NOTES = "@ 03-04\n食べる\n\n@ 03-11\n飲む\n"
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    (tmp_path / '2025').mkdir()
+    (tmp_path / '2025' / '03.txt').write_text(NOTES, encoding='utf-8')
+    (tmp_path / '2025' / '04.txt').write_text(NOTES.replace('@ 03-', '@ 04-'), encoding='utf-8')
+    corpus = LocalCorpus(tmp_path)
+    yield corpus
+    corpus.close()
+
+
+def test_unchanged_file_keeps_its_export(corpus):
+    assert corpus.export('2025/03') is corpus.export('2025/03')
+
+
+def test_rewritten_file_is_mapped_again(corpus):
+    old = corpus.export('2025/03')
+    corpus.paths['2025/03'].write_text("@ 03-04\n行く\n", encoding='utf-8')
+    os.utime(corpus.paths['2025/03'], ns=(0, 0))
+
+    new = corpus.export('2025/03')
+    assert new is not old
+    assert [l.content for l in new.lessons] == ['行く']
+    with pytest.raises(ValueError):
+        old.lessons[0].content
+
+
+def test_deleted_file_is_dropped_from_the_index(corpus):
+    index = LessonIndex()
+    for name in corpus.names():
+        index.update_document(name, corpus.export(name), name=name)
+
+    os.remove(corpus.paths['2025/04'])
+    assert corpus.export('2025/04') is None
+    assert index.remove_document('2025/04')
+
+    assert '2025/04' not in index
+    assert [l.content for l in index.lessons()] == ['食べる', '飲む']
+    assert not index.remove_document('2025/04')
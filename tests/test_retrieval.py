@@ -0,0 +1,100 @@
+import pytest
+
+from retrieval import MASTERY_THRESHOLD, PassageIndex, split_passages, weakness_queries
+
+EAT = "食べる (타베루) 먹다\nご飯を食べる"
+DRINK = "飲む (노무) 마시다\n水を飲む"
+GO = "行く (이쿠) 가다\n学校へ行く"
+
+
+@pytest.fixture
+def index():
+    index = PassageIndex()
+    index.update_document('2025/03', [EAT, DRINK])
+    index.update_document('2025/04', [GO])
+    return index
+
+
+def test_split_passages_groups_non_empty_lines():
+    content = "\n".join(f"line {i}" for i in range(8)) + "\n\n"
+    assert split_passages(content, max_lines=3) == [
+        "line 0\nline 1\nline 2", "line 3\nline 4\nline 5", "line 6\nline 7",
+    ]
+
+
+def test_unchanged_doc_hash_skips_without_reading_contents():
+    index = PassageIndex()
+    assert index.update_document('doc', [EAT, DRINK], doc_hash='v1') == 2
+
+    def contents():
+        raise AssertionError("contents read for an unchanged document")
+        yield
+
+    assert index.update_document('doc', contents(), doc_hash='v1') == 0
+
+
+def test_only_new_lessons_are_vectorized():
+    index = PassageIndex()
+    index.update_document('doc', [EAT, DRINK])
+    assert index.update_document('doc', [EAT, DRINK]) == 0
+    assert index.update_document('doc', [EAT, DRINK, GO]) == 1
+    assert len(index) == 3
+
+    # A removed lesson drops out of the results.
+    index.update_document('doc', [EAT, GO])
+    assert [passage for _, _, passage in index.query(["飲む"])] == []
+
+
+def test_query_orders_by_similarity(index):
+    results = index.query(["ご飯を食べる"])
+
+    assert results[0][1:] == ('2025/03', EAT)
+    assert [score for score, _, _ in results] == sorted((score for score, _, _ in results), reverse=True)
+    assert all(score > 0 for score, _, _ in results)
+
+
+def test_query_top_k(index):
+    assert len(index.query(["る", "食べる 飲む 行く"], top_k=2)) == 2
+    assert len(index.query(["食べる 飲む 行く"], top_k=None)) == 3
+
+
+def test_query_empty_cases(index):
+    assert index.query([]) == []
+    assert index.query(["", None]) == []
+    assert index.query(["zzzz"]) == []
+    assert PassageIndex().query(["食べる"]) == []
+
+
+def test_select_passages_respects_budget(index):
+    selected = index.select_passages(["食べる 飲む 行く"], max_chars=len(EAT) + len(DRINK) + 2)
+
+    assert len(selected) == 2
+    assert sum(len(p) for p in selected) + 2 * (len(selected) - 1) <= len(EAT) + len(DRINK) + 2
+
+
+def test_select_passages_dedupes_across_documents():
+    index = PassageIndex()
+    index.update_document('a', [EAT])
+    index.update_document('b', [EAT])
+
+    assert index.select_passages(["食べる"], max_chars=1000) == [EAT]
+
+
+def test_remove_document(index):
+    index.remove_document('2025/04')
+    assert index.query(["学校へ行く"]) == []
+
+
+def test_weakness_queries():
+    history = {
+        'wrong_notes': [
+            {'question': 'Q1', 'options': ['a', 'b'], 'answer_index': 1, 'explanation': 'E1'},
+            {'question': 'Q2', 'options': ['a'], 'answer_index': 5, 'explanation': ''},
+        ],
+        'mastery': {'Q1': 0, 'Q3': MASTERY_THRESHOLD - 1, 'Q4': MASTERY_THRESHOLD},
+    }
+
+    # Most recent wrong note first; mastered and already listed questions skipped.
+    assert weakness_queries(history) == ['Q2', 'Q1 b E1', 'Q3']
+    assert weakness_queries(history, limit=1) == ['Q2']
+    assert weakness_queries({}) == []
@@ -1,53 +1,41 @@
-import re
+import argparse
 import json
+import os
 
-def parse_doc(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
-    lessons = {}
-    current_date = None
-    current_content = []
+from local_corpus import ExportFile, LocalCorpus
 
-    # Regex to find lines starting with "@ MM-DD"
-    date_pattern = re.compile(r'^@\s*(\d{1,2}-\d{1,2})')
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
+def parse_doc(file_path):
+    export = ExportFile(file_path)
+    try:
+        return {
+            month: [{'date': l.date, 'content': l.content} for l in lessons]
+            for month, lessons in export.doc_data().items()
+        }
+    finally:
+        export.close()
+
+def lesson_index(export):
+    # Offsets only; no lesson text is read.
+    return [{'date': l.date, 'start': l.start, 'bytes': l.byte_length} for l in export.lessons]
 
-        match = date_pattern.match(line)
-        if match:
-            # Save previous lesson if exists
-            if current_date:
-                month = current_date.split('-')[0]
-                if month not in lessons:
-                    lessons[month] = []
-                lessons[month].append({
-                    'date': current_date,
-                    'content': '\n'.join(current_content).strip()
-                })
-            
-            # Start new lesson
-            current_date = match.group(1)
-            current_content = []
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Parse exported lesson notes (a file or a directory of *.txt).")
+    parser.add_argument('path', nargs='?', default='doc_export.txt')
+    parser.add_argument('--index', action='store_true', help="print lesson byte offsets instead of content")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.path):
+        corpus = LocalCorpus(args.path)
+        if args.index:
+            result = {name: lesson_index(corpus.export(name)) for name in corpus.names()}
         else:
-            if current_date:
-                current_content.append(line)
-
-    # Save the last lessen
-    if current_date:
-        month = current_date.split('-')[0]
-        if month not in lessons:
-            lessons[month] = []
-        lessons[month].append({
-            'date': current_date,
-            'content': '\n'.join(current_content).strip()
-        })
+            result = {name: parse_doc(corpus.paths[name]) for name in corpus.names()}
+        corpus.close()
+    elif args.index:
+        export = ExportFile(args.path)
+        result = lesson_index(export)
+        export.close()
+    else:
+        result = parse_doc(args.path)
 
-    return lessons
-
-if __name__ == '__main__':
-    result = parse_doc('doc_export.txt')
     print(json.dumps(result, indent=2, ensure_ascii=False))